@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class AnswerCache:
+    """
+    Semantinis atsakymų cache'as pasikartojantiems klausimams.
+
+    - Įrašas: (redakcijos URL, klausimo skaičiai, klausimas, klausimo embedding'as, struktūrizuotas atsakymas).
+    - Naujas klausimas lyginamas tik su tos pačios redakcijos įrašais, kurių skaičiai (straipsnių
+      numeriai, datos ir pan.) sutampa tiksliai – embedding'ai "5 straipsnis" ir "6 straipsnis"
+      beveik neskiria. Pataikymas – kai kosinusinis panašumas ne mažesnis už threshold.
+    - Įrašai saugomi SQLite faile šalia vektorių bazės, o redakcijos vektorių matrica laikoma atmintyje.
+    - Importuojant redakcijas jų įrašai pašalinami (invalidate_editions); seni įrašai pasensta po ttl_seconds.
+      Atsakymas, kurio skaičiavimas prasidėjo prieš redakcijos invalidavimą, neįrašomas (žr. generation).
+    """
+
+    FILE_NAME = "answer_cache.sqlite3"
+
+    def __init__(
+        self,
+        directory: str,
+        embeddings: Embeddings,
+        threshold: float = 0.92,
+        max_entries_per_edition: int = 1000,
+        ttl_seconds: int = 7 * 24 * 60 * 60,
+    ):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries_per_edition = max_entries_per_edition
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # redakcijos URL -> (įrašai, normalizuotų vektorių matrica)
+        self._editions: Dict[str, Tuple[List[dict], np.ndarray]] = {}
+        # redakcijos URL -> invalidavimų skaičius
+        self._generations: Dict[str, int] = {}
+
+    def lookup(self, question: str, edition_url: str, numbers: str) -> Optional[dict]:
+        """Grąžina {"question", "response", "similarity"} panašiausiam įrašui su tais pačiais skaičiais arba None."""
+        entries, matrix = self._get_edition(edition_url)
+        candidates = [i for i, entry in enumerate(entries) if entry["numbers"] == numbers]
+        if not candidates:
+            with self._lock:
+                self.misses += 1
+            return None
+        entries = [entries[i] for i in candidates]
+        similarities = matrix[candidates] @ self._vector(question)
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        with self._lock:
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"question": entries[best]["question"], "response": entries[best]["response"], "similarity": similarity}
+
+    def generation(self, edition_url: str) -> int:
+        """Redakcijos kartos numeris; jį reikia perduoti put, kad po invalidavimo senas atsakymas būtų atmestas."""
+        with self._lock:
+            return self._generations.get(edition_url, 0)
+
+    def put(self, question: str, edition_url: str, numbers: str, response: dict, generation: int) -> None:
+        vector = self._vector(question)
+        now = time.time()
+        with self._lock:
+            # Redakcija invaliduota, kol buvo skaičiuojamas atsakymas
+            if self._generations.get(edition_url, 0) != generation:
+                return
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO answers (edition_url, numbers, question, vector, response, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        edition_url,
+                        numbers,
+                        question,
+                        vector.astype(np.float32).tobytes(),
+                        json.dumps(response, ensure_ascii=False),
+                        now,
+                    ),
+                )
+                conn.execute(
+                    "DELETE FROM answers WHERE edition_url = ? AND (created < ? OR id NOT IN ("
+                    " SELECT id FROM answers WHERE edition_url = ? ORDER BY created DESC LIMIT ?))",
+                    (edition_url, now - self.ttl_seconds, edition_url, self.max_entries_per_edition),
+                )
+                self._editions.pop(edition_url, None)
+
+    def invalidate_editions(self, urls: List[str]) -> None:
+        with self._lock:
+            for url in urls:
+                self._editions.pop(url, None)
+                self._generations[url] = self._generations.get(url, 0) + 1
+            if not os.path.exists(self.path):
+                return
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM answers WHERE edition_url = ?", [(url,) for url in urls])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _vector(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _get_edition(self, edition_url: str) -> Tuple[List[dict], np.ndarray]:
+        with self._lock:
+            cached = self._editions.get(edition_url)
+            if cached is not None:
+                return cached
+            if not os.path.exists(self.path):
+                return [], np.empty((0, 0), dtype=np.float32)
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT numbers, question, vector, response FROM answers"
+                    " WHERE edition_url = ? AND created >= ? ORDER BY created",
+                    (edition_url, time.time() - self.ttl_seconds),
+                ).fetchall()
+            entries = [{"numbers": n, "question": q, "response": json.loads(r)} for n, q, _, r in rows]
+            vectors = [np.frombuffer(v, dtype=np.float32) for _, _, v, _ in rows]
+            matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+            self._editions[edition_url] = (entries, matrix)
+            return entries, matrix
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " edition_url TEXT NOT NULL,"
+            " numbers TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS answers_edition ON answers (edition_url, created)")
+        return conn
@@ -0,0 +1,177 @@
+import difflib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+class ArticleDiff:
+    """
+    Straipsnių ir redakcijų palyginimas: pastraipų lygio difflib palyginimas,
+    o pakeistoms pastraipoms – žodžių lygio santrauka ("[-senas-]{+naujas+}")
+    su keliais konteksto žodžiais. Rezultatas – kompaktiškas JSON tipo žodynas agentui.
+    """
+
+    CONTEXT_WORDS = 4
+
+    @classmethod
+    def diff_texts(cls, old_text: str, new_text: str) -> List[dict]:
+        old_paragraphs = cls._paragraphs(old_text)
+        new_paragraphs = cls._paragraphs(new_text)
+        matcher = difflib.SequenceMatcher(None, old_paragraphs, new_paragraphs, autojunk=False)
+        changes = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            if tag == "replace":
+                old_block, new_block = old_paragraphs[i1:i2], new_paragraphs[j1:j2]
+                for k in range(max(len(old_block), len(new_block))):
+                    old = old_block[k] if k < len(old_block) else None
+                    new = new_block[k] if k < len(new_block) else None
+                    changes.append(cls._paragraph_change(old, new))
+            elif tag == "delete":
+                changes.extend(cls._paragraph_change(p, None) for p in old_paragraphs[i1:i2])
+            else:
+                changes.extend(cls._paragraph_change(None, p) for p in new_paragraphs[j1:j2])
+        return changes
+
+    @classmethod
+    def diff_documents(cls, old: Optional[Document], new: Optional[Document]) -> dict:
+        if old is None and new is None:
+            return {"status": "missing"}
+        if old is None:
+            return {"status": "added", "title": new.metadata.get("title"), "text": new.page_content}
+        if new is None:
+            return {"status": "removed", "title": old.metadata.get("title")}
+        changes = cls.diff_texts(old.page_content, new.page_content)
+        if not changes:
+            return {"status": "unchanged", "title": new.metadata.get("title")}
+        return {"status": "changed", "title": new.metadata.get("title"), "changes": changes}
+
+    @classmethod
+    def diff_editions(cls, old_articles: Dict[str, Document], new_articles: Dict[str, Document]) -> dict:
+        """Palygina dviejų redakcijų straipsnius (normalizuotas nr. -> Document)."""
+        added = [no for no in new_articles if no not in old_articles]
+        removed = [no for no in old_articles if no not in new_articles]
+        changed = []
+        unchanged = 0
+        for no, new in new_articles.items():
+            old = old_articles.get(no)
+            if old is None:
+                continue
+            diff = cls.diff_documents(old, new)
+            if diff["status"] == "unchanged":
+                unchanged += 1
+            else:
+                changed.append({"article_no": no, **diff})
+        return {
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            "unchanged": unchanged,
+        }
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    @staticmethod
+    def _paragraphs(text: str) -> List[str]:
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    @classmethod
+    def _paragraph_change(cls, old: Optional[str], new: Optional[str]) -> dict:
+        if old is None:
+            return {"type": "inserted", "new": new}
+        if new is None:
+            return {"type": "deleted", "old": old}
+        return {"type": "replaced", "words": cls._word_diff(old, new)}
+
+    @classmethod
+    def _word_diff(cls, old: str, new: str) -> str:
+        old_words, new_words = old.split(), new.split()
+        matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+        opcodes = matcher.get_opcodes()
+        parts = []
+        for n, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag == "equal":
+                words = old_words[i1:i2]
+                # Kontekstas paliekamas tik šalia pakeitimų, likusi nepakitusi dalis sutraukiama į "…"
+                keep_head = 0 if n == 0 else cls.CONTEXT_WORDS
+                keep_tail = 0 if n == len(opcodes) - 1 else cls.CONTEXT_WORDS
+                if len(words) > keep_head + keep_tail:
+                    words = words[:keep_head] + ["…"] + (words[-keep_tail:] if keep_tail else [])
+                parts.append(" ".join(words))
+                continue
+            if i2 > i1:
+                parts.append("[-" + " ".join(old_words[i1:i2]) + "-]")
+            if j2 > j1:
+                parts.append("{+" + " ".join(new_words[j1:j2]) + "+}")
+        return " ".join(p for p in parts if p)
+
+
+class EditionDiffCache:
+    """
+    Iš anksto (importo metu) apskaičiuoti gretimų redakcijų palyginimai,
+    saugomi JSON faile šalia vektorių bazės. Raktas – (senesnės, naujesnės redakcijos URL).
+    """
+
+    FORMAT_VERSION = 1
+    FILE_NAME = "edition_diffs.json"
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._diffs: Optional[Dict[str, dict]] = None
+
+    def get(self, old_url: str, new_url: str) -> Optional[dict]:
+        return self._get_diffs().get(self._key(old_url, new_url))
+
+    def replace_for_editions(self, urls: List[str], diffs: Dict[Tuple[str, str], dict]) -> None:
+        """Pašalina visus palyginimus, kuriuose dalyvauja urls redakcijos, ir įrašo naujus."""
+        touched = set(urls)
+        stored = self._get_diffs()
+        with self._lock:
+            kept = {
+                key: diff for key, diff in stored.items()
+                if not touched.intersection(json.loads(key))
+            }
+            for (old_url, new_url), diff in diffs.items():
+                kept[self._key(old_url, new_url)] = diff
+            self._write(kept)
+            self._diffs = kept
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    @staticmethod
+    def _key(old_url: str, new_url: str) -> str:
+        return json.dumps([old_url, new_url])
+
+    def _get_diffs(self) -> Dict[str, dict]:
+        diffs = self._diffs
+        if diffs is not None:
+            return diffs
+        with self._lock:
+            if self._diffs is None:
+                self._diffs = self._read()
+            return self._diffs
+
+    def _read(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable edition diffs {self.path}: {e}")
+            return {}
+        if data.get("format_version") != self.FORMAT_VERSION:
+            return {}
+        return data.get("diffs", {})
+
+    def _write(self, diffs: Dict[str, dict]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format_version": self.FORMAT_VERSION, "diffs": diffs}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
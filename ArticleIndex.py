@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+class ArticleIndex:
+    """
+    Straipsnių indeksas: (redakcijos URL, normalizuotas straipsnio nr.) -> sujungtas straipsnio tekstas.
+
+    Sudaromas importo metu iš tų pačių chunk'ų, kurie rašomi į Chroma, ir saugomas
+    JSON faile šalia vektorių bazės. Paieška pagal straipsnio numerį tampa žodyno
+    paieška; importuojant redakciją pakeičiami tik jos įrašai.
+    """
+
+    FORMAT_VERSION = 1
+    FILE_NAME = "article_index.json"
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._editions: Optional[Dict[str, Dict[str, dict]]] = None
+
+    @staticmethod
+    def normalize_article_no(no: str) -> str:
+        """"37(1)", "37-1", " 37-1 straipsnis" -> "37-1"; "37.1(2)" -> "37.1-2"."""
+        no = no.strip().lower()
+        no = re.sub(r"\s*straipsn\w*\.?$", "", no)
+        no = re.sub(r"\s+", "", no)
+        return re.sub(r"\((\d+)\)", r"-\1", no)
+
+    def has_edition(self, url: str) -> bool:
+        return url in self._get_editions()
+
+    def get(self, url: str, article_no: str) -> Optional[Document]:
+        row = self._get_editions().get(url, {}).get(self.normalize_article_no(article_no))
+        if row is None:
+            return None
+        return Document(page_content=row["page_content"], metadata=dict(row["metadata"]))
+
+    def get_edition(self, url: str) -> Dict[str, Document]:
+        """Visi redakcijos straipsniai: normalizuotas nr. -> Document."""
+        return {
+            no: Document(page_content=row["page_content"], metadata=dict(row["metadata"]))
+            for no, row in self._get_editions().get(url, {}).items()
+        }
+
+    def replace_editions(self, articles: Dict[str, List[Tuple[str, Document]]]) -> None:
+        """
+        Pakeičia nurodytų redakcijų įrašus; articles – URL -> [(straipsnio nr., sujungtas Document)].
+        Jei redakcijoje numeris kartojasi, paliekamas pirmasis.
+        """
+        editions = dict(self._get_editions())
+        with self._lock:
+            for url, docs in articles.items():
+                rows: Dict[str, dict] = {}
+                for no, doc in docs:
+                    rows.setdefault(self.normalize_article_no(no), {
+                        "page_content": doc.page_content,
+                        "metadata": doc.metadata,
+                    })
+                editions[url] = rows
+            self._write(editions)
+            self._editions = editions
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _get_editions(self) -> Dict[str, Dict[str, dict]]:
+        editions = self._editions
+        if editions is not None:
+            return editions
+        with self._lock:
+            if self._editions is None:
+                self._editions = self._read()
+            return self._editions
+
+    def _read(self) -> Dict[str, Dict[str, dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable article index {self.path}: {e}")
+            return {}
+        if data.get("format_version") != self.FORMAT_VERSION:
+            return {}
+        return data.get("editions", {})
+
+    def _write(self, editions: Dict[str, Dict[str, dict]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format_version": self.FORMAT_VERSION, "editions": editions}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
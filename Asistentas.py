@@ -3,7 +3,8 @@ import os
 import re
 import streamlit as st
 import streamlit.components.v1 as components
-from ESeimasAgent import ESeimasAgent
+from ESeimasAgent import Paragraph, Response, get_shared_agent
+from RateLimiter import RateLimiterBusy
 import uuid
 import logging
 
@@ -30,7 +31,8 @@ if "eseimas_agent" not in st.session_state:
         openai_api_key = st.secrets["OPENAI_API_KEY"]    
         os.environ["OPENAI_API_KEY"] = openai_api_key
     
-        st.session_state.eseimas_agent = ESeimasAgent(db_name="pm_chroma_db", law_name="Pelno mokesčio įstatymas")
+        # One agent core (Store, vector client, model, graph) per process; a session only keeps its thread id and history
+        st.session_state.eseimas_agent = get_shared_agent(db_name="pm_chroma_db", law_name="Pelno mokesčio įstatymas")
 
         eseimas_agent = st.session_state.eseimas_agent
 
@@ -95,11 +97,34 @@ def on_user_input_change():
         st.session_state.chat_history_raw.append({"role": "user", "content": sanitized})
         st.session_state.chat_history_display.append(format_user_input(st.session_state.user_input))
 
-        with st.spinner("Atsakymas generuojamas..."):
-            response = eseimas_agent.get_agent_response(
-                st.session_state.chat_history_raw[-1],
-                parameters=st.session_state.input
+        # Stream tool calls and partial paragraphs into a placeholder until the final response arrives
+        response = None
+        tool_lines = []
+        partial_html = ""
+        placeholder = st.empty()
+        # Backpressure: tell the user when the shared OpenAI budget already has a queue
+        limiter_status = eseimas_agent.rate_limit_status()
+        if limiter_status["queued"]:
+            placeholder.markdown(
+                f"<i>Užklausa eilėje (prieš jus {limiter_status['queued']}, "
+                f"apie {limiter_status['estimated_wait']:.0f}s)...</i>",
+                unsafe_allow_html=True
             )
+        else:
+            placeholder.markdown("<i>Atsakymas generuojamas...</i>", unsafe_allow_html=True)
+        for event in eseimas_agent.stream_agent_response(
+            st.session_state.chat_history_raw[-1],
+            parameters=st.session_state.input
+        ):
+            if event["type"] == "tool_call":
+                tool_lines.append(f"<small><i>Kviečiamas įrankis: {event['name']}</i></small>")
+            elif event["type"] == "paragraphs":
+                partial_html = format_response(Response(paragraphs=[Paragraph(**p) for p in event["paragraphs"]]))
+            elif event["type"] == "final":
+                response = event["response"]
+                break
+            placeholder.markdown("<br>".join(tool_lines + [partial_html]), unsafe_allow_html=True)
+        placeholder.empty()
         st.session_state.chat_history_raw.append({"role": "assistant", "content": response["output_text"]})    
         st.session_state.chat_history_display.append(format_response(response["output_parsed"]))
         st.session_state.execution_trace = response["execution_trace"]
@@ -113,14 +138,42 @@ def on_user_input_change():
             st.session_state.execution_trace.append(
             f"<b>Laiko statistika:</b> bendras laikas: {timings.get('total_time', 0):.2f}s"
             )
+            fast_path = timings.get("fast_path")
+            if fast_path:
+                saved = fast_path.get("estimated_time_saved")
+                st.session_state.execution_trace.append(
+                    f"&nbsp;&nbsp;<i>Greitasis kelias:</i> {fast_path.get('route') or 'agentas'}"
+                    f" (pataikymai {fast_path.get('hits', 0)}/{fast_path.get('requests', 0)}"
+                    + (f", sutaupyta ~{saved:.2f}s" if saved is not None else "") + ")"
+                )
+            rate_limit = timings.get("rate_limit")
+            if rate_limit and rate_limit.get("queued_calls"):
+                st.session_state.execution_trace.append(
+                    f"&nbsp;&nbsp;<i>OpenAI eilė:</i> {timings.get('step_timings', {}).get('queue_wait', 0):.2f}s"
+                    f" ({rate_limit['queued_calls']} kvietimai)"
+                )
             tool_timings = timings.get("tool_timings", {})
             if tool_timings:
                 for tt in tool_timings:
                     st.session_state.execution_trace.append(
                         f"&nbsp;&nbsp;<i>{tt["tool"]}:</i> {tt["time"]:.2f}s"
+                        f" ({tt.get("start", 0):.2f}s – {tt.get("end", 0):.2f}s)"
+                        + (" – sujungta su lygiagrečia užklausa" if tt.get("coalesced") else "")
                     )
+                    for step, step_time in tt.get("steps", {}).items():
+                        st.session_state.execution_trace.append(
+                            f"&nbsp;&nbsp;&nbsp;&nbsp;<i>{step}:</i> {step_time:.3f}s"
+                        )
+                    cache = tt.get("cache")
+                    if cache:
+                        retrieval, embedding = cache["retrieval"], cache["embedding"]
+                        st.session_state.execution_trace.append(
+                            f"&nbsp;&nbsp;&nbsp;&nbsp;<i>cache:</i> {'pataikyta' if cache['hit'] else 'nepataikyta'};"
+                            f" paieška {retrieval['hit_ratio']:.0%} (sutaupyta ~{retrieval['saved_time']:.2f}s),"
+                            f" embedding {embedding['hit_ratio']:.0%} (sutaupyta ~{embedding['saved_time']:.2f}s)"
+                        )
             
-            step_timing = timings.get("step_timing", {})
+            step_timing = timings.get("step_timings", {})
             if step_timing and isinstance(step_timing, dict):
                 st.session_state.execution_trace.append("<b>Veiksmų laikas:</b>")
                 for step, timing in step_timing.items():
@@ -128,6 +181,10 @@ def on_user_input_change():
                         f"&nbsp;&nbsp;<i>{step}:</i> {timing:.3f}s"
                     )
 
+    except RateLimiterBusy:
+        st.warning("Šiuo metu sistema perkrauta. Bandykite po kelių sekundžių.")
+        logging.error("Rate limiter queue full: %s", traceback.format_exc())
+
     except Exception as e:
         st.error("Įvyko klaida apdorojant užklausą.")
         logging.error("Exception in on_user_input_change: %s", traceback.format_exc())
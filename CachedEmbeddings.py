@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from QueryCache import QueryCache
+from RateLimiter import RateLimiter
+from SingleFlight import SingleFlight
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings apvalkalas su nuolatiniu SQLite cache'u.
+
+    Raktas – (modelis, dimensijos, teksto sha256). Tas pats straipsnio tekstas
+    skirtingose redakcijose embed'inamas tik vieną kartą; API kviečiamas tik
+    tekstams, kurių cache'e dar nėra. Jei nurodytas rate_limiter, API kvietimai
+    praeina per bendrą užklausų/tokenų biudžetą.
+    """
+
+    _LOOKUP_BATCH = 500
+    # Užklausų (klausimų) vektoriai laikomi atmintyje; dokumentų vektoriai – SQLite
+    QUERY_CACHE_SIZE = 2048
+    QUERY_CACHE_TTL = 24 * 60 * 60
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model: str,
+        dimensions: Optional[int] = None,
+        path: str = "./embedding_cache.sqlite3",
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.underlying = underlying
+        self.model = model
+        self.dimensions = dimensions or 0
+        self.path = path
+        self.rate_limiter = rate_limiter
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        self.query_cache = QueryCache(self.QUERY_CACHE_SIZE, self.QUERY_CACHE_TTL)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " dimensions INTEGER NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, dimensions, text_hash))"
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(t) for t in texts]
+        vectors = self._lookup(hashes)
+
+        missing: Dict[str, str] = {}
+        for text, h in zip(texts, hashes):
+            if h not in vectors:
+                missing.setdefault(h, text)
+
+        with self._lock:
+            self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+            self.misses += len(missing)
+
+        if missing:
+            self._acquire(missing.values())
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self._save(computed)
+            vectors.update(computed)
+
+        return [list(vectors[h]) for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Pasikartojantys klausimai imami iš cache'o; tas pats klausimas, vienu metu užduotas
+        # kelių naudotojų, embed'inamas vieną kartą
+        key = " ".join(text.split())
+        vector, _ = self.query_cache.get_or_compute(
+            key, lambda: self._single_flight.do(key, lambda: self._embed_query(text))[0]
+        )
+        return list(vector)
+
+    def missing(self, texts: List[str]) -> List[str]:
+        """Grąžina (unikalius) tekstus, kurių embedding'ų cache'e dar nėra."""
+        hashes = {self._hash(t): t for t in texts}
+        cached = self._lookup(list(hashes))
+        return [t for h, t in hashes.items() if h not in cached]
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _embed_query(self, text: str) -> List[float]:
+        self._acquire([text])
+        return self.underlying.embed_query(text)
+
+    def _acquire(self, texts) -> None:
+        if self.rate_limiter is not None:
+            # Apytikslis tokenų skaičius (~4 simboliai tokenui) – tikslumo biudžetui pakanka
+            self.rate_limiter.acquire(sum(len(t) for t in texts) // 4 + 1)
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._connect() as conn:
+            for i in range(0, len(unique), self._LOOKUP_BATCH):
+                batch = unique[i:i + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings"
+                    f" WHERE model = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                    [self.model, self.dimensions, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def _save(self, vectors: Dict[str, List[float]]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimensions, text_hash, vector) VALUES (?, ?, ?, ?)",
+                [
+                    (self.model, self.dimensions, h, array("f", v).tobytes())
+                    for h, v in vectors.items()
+                ],
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
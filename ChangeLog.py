@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+
+class ChangeLog:
+    """
+    Struktūrizuota pakeitimų lentelė: redakcijos URL -> tos redakcijos "Pakeitimai:" sąrašas.
+
+    Pakeitimai išparsinami vieną kartą importo metu iš pilno "Pakeitimai:" dokumento
+    (ne iš chunk'ų), todėl nepraleidžiami įrašai, esantys ne paskutiniuose chunk'uose.
+    Lentelė saugoma JSON faile šalia vektorių bazės; importuojant redakciją
+    pakeičiami tik jos įrašai.
+    """
+
+    FORMAT_VERSION = 1
+    FILE_NAME = "change_log.json"
+    TITLE = "Pakeitimai:"
+
+    _ENTRY_PATTERN = re.compile(
+        r'(?P<number>\d+)\.\n'
+        r'(?P<text1>.+?)\n'
+        r'Nr\. [^\[]+\[href="(?P<url>[^"]+)"\], [^\n]+\n'
+        r'(?P<text2>.+?)(?=\n\d+\.|\Z)', re.DOTALL
+    )
+    _LINK_PATTERN = re.compile(r'\[href="[^"]+"\]')
+    _DATE_PATTERN = re.compile(r'\], (\d{4}-\d{2}-\d{2}),')
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self._editions: Optional[Dict[str, dict]] = None
+
+    @classmethod
+    def parse_changes(cls, text: str) -> List[dict]:
+        """Išparsina "Pakeitimai:" tekstą į įrašus su laukais number, url, date ir text."""
+        results = []
+        for match in cls._ENTRY_PATTERN.finditer(text):
+            number = int(match.group('number'))
+            url = match.group('url')
+            reference_line = match.group(0).splitlines()[2]
+            text1 = cls._LINK_PATTERN.sub('', match.group('text1')).strip()
+            text2 = match.group('text2').strip()
+            change_text = f"{text1}\n{reference_line}\n{text2}".strip()
+            change_text = cls._LINK_PATTERN.sub('', change_text)
+            date = cls._DATE_PATTERN.search(reference_line)
+            results.append({
+                "number": number,
+                "url": url,
+                "date": date.group(1) if date else None,
+                "text": change_text
+            })
+        return results
+
+    def has_edition(self, url: str) -> bool:
+        return url in self._get_editions()
+
+    def get_changes(self, url: str) -> List[dict]:
+        edition = self._get_editions().get(url)
+        return list(edition["changes"]) if edition else []
+
+    def replace_editions(self, docs_by_url: Dict[str, List[Document]]) -> None:
+        """Pakeičia nurodytų redakcijų įrašus, išparsinus jų "Pakeitimai:" dokumentus."""
+        editions = dict(self._get_editions())
+        with self._lock:
+            for url, docs in docs_by_url.items():
+                if not docs:
+                    editions.pop(url, None)
+                    continue
+                change_docs = [doc for doc in docs if doc.metadata.get("title") == self.TITLE]
+                meta = (change_docs or docs)[0].metadata
+                changes = self.parse_changes(change_docs[0].page_content) if change_docs else []
+                editions[url] = {
+                    "effective_from": meta.get("effective_from"),
+                    "effective_to": meta.get("effective_to"),
+                    "changes": sorted(changes, key=lambda change: change["number"]),
+                }
+            self._write(editions)
+            self._editions = editions
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _get_editions(self) -> Dict[str, dict]:
+        editions = self._editions
+        if editions is not None:
+            return editions
+        with self._lock:
+            if self._editions is None:
+                self._editions = self._read()
+            return self._editions
+
+    def _read(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable change log {self.path}: {e}")
+            return {}
+        if data.get("format_version") != self.FORMAT_VERSION:
+            return {}
+        return data.get("editions", {})
+
+    def _write(self, editions: Dict[str, dict]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format_version": self.FORMAT_VERSION, "editions": editions}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
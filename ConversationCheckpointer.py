@@ -0,0 +1,316 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+
+class ConversationCheckpointer(BaseCheckpointSaver):
+    """
+    Pokalbių checkpointer'is SQLite faile su ribotu dydžiu.
+
+    - Kiekvienam pokalbiui (thread_id, checkpoint_ns) saugomas tik paskutinis checkpoint'as
+      ir jo laukiantys įrašai, todėl istorija neauga su kiekvienu grafo žingsniu.
+    - Pokalbiai, nenaudoti ilgiau nei ttl_seconds, ištrinami.
+    - Jei pokalbių daugiau nei max_threads, ištrinami seniausiai naudoti (LRU).
+    Asinchroniniai metodai vykdo tas pačias operacijas atskiroje gijoje.
+    """
+
+    _EVICT_EVERY = 50
+
+    def __init__(
+        self,
+        path: str = "./checkpoints.sqlite3",
+        ttl_seconds: float = 24 * 3600,
+        max_threads: int = 1000,
+    ):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT,"
+                " checkpoint_type TEXT NOT NULL,"
+                " checkpoint BLOB NOT NULL,"
+                " metadata_type TEXT NOT NULL,"
+                " metadata BLOB NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " value_type TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " task_path TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                " thread_id TEXT PRIMARY KEY,"
+                " last_access REAL NOT NULL)"
+            )
+        self.evict()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        requested_id = get_checkpoint_id(config)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata"
+                " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+            # Only the latest checkpoint is kept; older ones are gone
+            if row is None or (requested_id and requested_id != row[0]):
+                return None
+            writes = conn.execute(
+                "SELECT task_id, channel, value_type, value FROM writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+                " ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, row[0]),
+            ).fetchall()
+            self._touch(conn, thread_id)
+        return self._to_tuple(thread_id, checkpoint_ns, row, writes)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        params: Tuple[Any, ...] = ()
+        if config:
+            query += " WHERE thread_id = ?"
+            params = (config["configurable"]["thread_id"],)
+            if "checkpoint_ns" in config["configurable"]:
+                query += " AND checkpoint_ns = ?"
+                params += (config["configurable"]["checkpoint_ns"],)
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        count = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            if before and (before_id := get_checkpoint_id(before)) and row[0] >= before_id:
+                continue
+            result = self._to_tuple(thread_id, checkpoint_ns, row, [])
+            if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None and count >= limit:
+                break
+            count += 1
+            yield result
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints"
+                " (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+                " checkpoint_type, checkpoint, metadata_type, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                    checkpoint_type, checkpoint_blob, metadata_type, metadata_blob,
+                ),
+            )
+            # Pending writes of the replaced checkpoints are no longer reachable
+            conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id") or ""),
+            )
+            self._touch(conn, thread_id)
+            self._puts_since_evict += 1
+            evict = self._puts_since_evict >= self._EVICT_EVERY
+        if evict:
+            self.evict()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                channel, value_type, value_blob, task_path,
+            ))
+        # Special channels (negative idx: errors, interrupts) overwrite; regular writes keep the first attempt
+        with self._lock, self._connect() as conn:
+            for conflict, selected in (("REPLACE", [r for r in rows if r[4] < 0]), ("IGNORE", [r for r in rows if r[4] >= 0])):
+                conn.executemany(
+                    f"INSERT OR {conflict} INTO writes"
+                    " (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    selected,
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            self._delete_threads(conn, [thread_id])
+
+    def evict(self) -> int:
+        """Ištrina pasenusius ir LRU ribą viršijančius pokalbius. Grąžina ištrintų pokalbių skaičių."""
+        with self._lock, self._connect() as conn:
+            self._puts_since_evict = 0
+            expired = [
+                row[0] for row in conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+            ]
+            overflow = [
+                row[0] for row in conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access >= ?"
+                    " ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                    (time.time() - self.ttl_seconds, self.max_threads),
+                )
+            ]
+            self._delete_threads(conn, expired + overflow)
+        return len(expired) + len(overflow)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for result in results:
+            yield result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row, writes) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((checkpoint_type, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, thread_id: str) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO threads (thread_id, last_access) VALUES (?, ?)",
+            (thread_id, time.time()),
+        )
+
+    @staticmethod
+    def _delete_threads(conn: sqlite3.Connection, thread_ids) -> None:
+        for table in ("checkpoints", "writes", "threads"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+
+class DocumentSnapshotStore:
+    """
+    Išparsintų redakcijų (Document sąrašų) momentinės kopijos diske.
+
+    Vienas failas vienam URL: gzip suspaustas JSONL, kurio pirma eilutė – antraštė
+    (formato ir parserio versijos, URL, HTML turinio hash'as, dokumentų skaičius),
+    o toliau po vieną eilutę kiekvienam Document.
+    Kopija naudojama tik tada, kai sutampa visos versijos ir turinio hash'as.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory: str = "./document_snapshots"):
+        self.directory = directory
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    def load(self, url: str, content_hash: str, parser_version: int) -> Optional[List[Document]]:
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if (
+                    header.get("format_version") != self.FORMAT_VERSION
+                    or header.get("parser_version") != parser_version
+                    or header.get("url") != url
+                    or header.get("content_hash") != content_hash
+                ):
+                    return None
+                docs = []
+                for line in f:
+                    row = json.loads(line)
+                    docs.append(Document(page_content=row["page_content"], metadata=row["metadata"]))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable snapshot {path}: {e}")
+            return None
+        if len(docs) != header.get("documents"):
+            return None
+        return docs
+
+    def save(self, url: str, content_hash: str, parser_version: int, docs: List[Document]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp_path = path + ".tmp"
+        header = {
+            "format_version": self.FORMAT_VERSION,
+            "parser_version": parser_version,
+            "url": url,
+            "content_hash": content_hash,
+            "documents": len(docs),
+        }
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for doc in docs:
+                f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".jsonl.gz")
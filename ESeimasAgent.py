@@ -1,16 +1,28 @@
 from LangChainTokenUsageCalculator import LangChainTokenUsageCalculator
+from contextvars import ContextVar
 from datetime import datetime
+import asyncio
+import threading
 import time
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, List, Optional
 from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import InMemorySaver
 from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware, ClearToolUsesEdit, ContextEditingMiddleware, ModelRequest, SummarizationMiddleware, dynamic_prompt
 from langchain.tools import tool
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.utils.json import parse_partial_json
 import json
-from Store import Store
-import requests
-import re
+from AnswerCache import AnswerCache
+from ConversationCheckpointer import ConversationCheckpointer
+from ArticleIndex import ArticleIndex
+from FastPathRouter import FastPathMatch, FastPathRouter
+from RateLimiter import RateLimiter, begin_session_request, get_shared_rate_limiter
+from SingleFlight import SingleFlight
+from Store import get_shared_store
 from bs4 import BeautifulSoup
 from io import StringIO
 
@@ -21,12 +33,139 @@ class Paragraph(BaseModel):
 class Response(BaseModel):    
     paragraphs: List[Paragraph]
 
+CHAT_MODEL = "openai:gpt-5-mini"
+
+# History compaction budgets (approximate tokens of the messages sent to the model)
+TOOL_RESULTS_TOKEN_BUDGET = 12_000
+HISTORY_TOKEN_BUDGET = 24_000
+
+# Process-wide OpenAI chat budget shared by all sessions; each call reserves its prompt size
+# plus an expected answer size, corrected from the usage metadata afterwards
+CHAT_REQUESTS_PER_MINUTE = 500
+CHAT_TOKENS_PER_MINUTE = 200_000
+CHAT_OUTPUT_TOKENS_ESTIMATE = 1_000
+
+# Minimal cosine similarity for a new question to reuse a cached answer of the same edition
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.92
+
+_shared_chat_models = {}
+_shared_chat_models_lock = threading.Lock()
+
+
+def get_shared_chat_model(model_name: str = CHAT_MODEL):
+    """Grąžina procesui bendrą pokalbių modelio klientą (kuriamas vieną kartą kiekvienam modeliui)."""
+    with _shared_chat_models_lock:
+        model = _shared_chat_models.get(model_name)
+        if model is None:
+            model = init_chat_model(model_name)
+            _shared_chat_models[model_name] = model
+        return model
+
+
+class RateLimitMiddleware(AgentMiddleware):
+    """Kiekvienas agento modelio kvietimas laukia savo eilės bendrame RateLimiter."""
+
+    def __init__(self, limiter: RateLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def wrap_model_call(self, request, handler):
+        estimate = self._estimate(request)
+        self.limiter.acquire(estimate)
+        response = handler(request)
+        self._settle(estimate, response)
+        return response
+
+    async def awrap_model_call(self, request, handler):
+        estimate = self._estimate(request)
+        await asyncio.to_thread(self.limiter.acquire, estimate)
+        response = await handler(request)
+        self._settle(estimate, response)
+        return response
+
+    @staticmethod
+    def _estimate(request) -> int:
+        messages = ([request.system_message] if request.system_message else []) + list(request.messages)
+        return count_tokens_approximately(messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+
+    def _settle(self, estimate: int, response) -> None:
+        used = sum(
+            (getattr(msg, "usage_metadata", None) or {}).get("total_tokens", 0)
+            for msg in getattr(response, "result", [response])
+        )
+        if used:
+            self.limiter.adjust(used - estimate)
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Modelio apvalkalas, kurio kvietimai laukia savo eilės bendrame RateLimiter.
+    Skirtas kvietimams, kurie nepraeina pro RateLimitMiddleware (pvz., istorijos santraukoms).
+    """
+
+    model: BaseChatModel
+    limiter: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.model._llm_type}"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimate = count_tokens_approximately(messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+        self.limiter.acquire(estimate)
+        message = self.model.invoke(messages, stop=stop, **kwargs)
+        return self._settle(estimate, message)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimate = count_tokens_approximately(messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+        await asyncio.to_thread(self.limiter.acquire, estimate)
+        message = await self.model.ainvoke(messages, stop=stop, **kwargs)
+        return self._settle(estimate, message)
+
+    def _settle(self, estimate: int, message) -> ChatResult:
+        used = (getattr(message, "usage_metadata", None) or {}).get("total_tokens", 0)
+        if used:
+            self.limiter.adjust(used - estimate)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# Tool timings of the request running in the current context. The agent is shared by all
+# sessions, so per-request state cannot live on the instance; tool worker threads inherit the context.
+_request_timings: ContextVar[Optional[dict]] = ContextVar("eseimas_request_timings", default=None)
+
+_shared_agents = {}
+_shared_agents_lock = threading.Lock()
+
+
+def get_shared_agent(db_name: str, law_name: str = "įstatymas") -> "ESeimasAgent":
+    """Grąžina procesui bendrą agentą (Store, modelis, įrankiai ir agento grafas vieni visoms sesijoms)."""
+    with _shared_agents_lock:
+        agent = _shared_agents.get((db_name, law_name))
+        if agent is None:
+            agent = ESeimasAgent(db_name, law_name=law_name)
+            _shared_agents[(db_name, law_name)] = agent
+        return agent
+
+
 class ESeimasAgent:
     def __init__(self, db_name: str, law_name: str = "įstatymas"):
         self.db_name = db_name
         self.law_name = law_name
-        self.store = Store(db_name)
-        self.checkpointer = InMemorySaver()
+        # Shared with the import page: a prefill there swaps the indexes every session reads
+        self.store = get_shared_store(db_name)
+        # Simple lookups (edition list, one article at one date) are answered without the agent loop
+        self.router = FastPathRouter(self.store)
+        # Answers to repeated questions, per edition; an import drops the answers of its editions
+        self.answer_cache = AnswerCache(
+            self.store.persist_directory, self.store.embeddings, threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        self.store.add_prefill_listener(self.answer_cache.invalidate_editions)
+        self.rate_limiter = get_shared_rate_limiter("openai-chat", CHAT_REQUESTS_PER_MINUTE, CHAT_TOKENS_PER_MINUTE)
+        # Compact edition list appended to the system prompt; rebuilt after the store is prefilled
+        self._edition_catalog: Optional[str] = None
+        self.store.add_prefill_listener(self._invalidate_edition_catalog)
+        # Latest checkpoint per conversation on disk; idle conversations expire (TTL) or are evicted (LRU)
+        self.checkpointer = ConversationCheckpointer()
         self.prompts = [
             {
                 "content": (
@@ -35,13 +174,15 @@ class ESeimasAgent:
                     "- Jei reikia, išskaidyk užduotį į mažesnes dalis, susidėliok kaip naudosi pateiktus įrankius pažingsniui, kad galėtum atsakyti į vartotojo klausimą.\n"
                     "- Informacijai gauti naudok tik pateiktus įrankius (tools).\n"
                     "- Kiekviena įstatymo redakcija turi savo galiojimo laikotarpį. Atsakyk į klausimus remdamasis tik ta redakcija, kuri galioja nurodytą datą.\n"
-                    "- Jei reikia, naudok įrankį, kad sužinotum dabartinę datą.\n"
+                    "- Dabartinė data ir prieinamų redakcijų sąrašas pateikti šių instrukcijų pabaigoje – jiems sužinoti įrankių kviesti nereikia.\n"
                     "- Pritaikyk aktualią datą prie vartotojo užklausos (pvz., jei vartotojas klausia apie mokesčius už praėjusius metus, naudok praėjusių metų datą, jei apie kitus metus – kitų metų datą ir t.t.).\n"
-                    "- Jei reikia, naudok įrankį, kad sužinotum galiojančias redakcijas, iš jų atsirink aktualią datą.\n"
+                    "- Iš pateikto redakcijų sąrašo atsirink redakciją, galiojančią aktualią datą.\n"
                     "- Jei reikia, naudok įrankį, kad sužinotum įstatymo tekstą pagal URL.\n"
                     "- Jei reikia, naudok įrankį, kad sužinotum įstatymo pakeitimus, galiojančius nurodytą datą.\n"
                     "- Jei reikia, naudok įrankį, kad sužinotum aktualią informaciją iš RAG duomenų bazės pagal užklausą ir datą.\n"
                     "- Jei reikia, naudok įrankį, kad sužinotum pilną straipsnio tekstą pagal straipsnio numerį ir datą.\n"
+                    "- Jei reikia kelių straipsnių arba to paties straipsnio keliomis datomis, gauk juos vienu kelių straipsnių įrankio kvietimu.\n"
+                    "- Jei reikia palyginti straipsnį ar redakcijas tarp dviejų datų, naudok palyginimo įrankį, o ne du pilnus straipsnio tekstus.\n"
                     "- Jei nieko neužsiminama apie laikotarpį, naudok dabartinę datą.\n"
                     "- Atsakyk trumpai ir aiškiai į vartotojo užduodamus klausimus pagal pateiktą informaciją.\n"
                     "- Remkis tik per tools pateikta informacija. Jei informacijos nepakanka, atsakyk trumpai, kad neturi pakankamai duomenų atsakyti į klausimą.\n"
@@ -54,10 +195,12 @@ class ESeimasAgent:
                 )
             }
         ]
-        # container to collect tool execution timings (list of dicts)
-        self._tool_timings = []
-
+        # Identical concurrent tool calls of different sessions share one computation
+        self._single_flight = SingleFlight()
         self._init_tools()
+        # Compiled agent graph; prompt, tools and response format never change, so it is built once
+        self._agent = None
+        self._agent_lock = threading.Lock()
         # Token usage calculator instance (LangChain-specific)
         self.token_calculator = LangChainTokenUsageCalculator(
             model="gpt-5-mini"
@@ -77,18 +220,14 @@ class ESeimasAgent:
             Atsakymas – aktualūs fragmentai ir jų šaltiniai, susiję su užklausa ir data.
             """
             start = time.perf_counter()
-            retrieved_docs = agent.store.query(query, date)
+            steps = {}
+            retrieved_docs = agent.store.query(query, date, timings=steps)
             serialized = "\n\n".join(
                 (f"Source: {doc.metadata}\nContent: {doc.page_content}")
                 for doc in retrieved_docs
             )
-            elapsed = time.perf_counter() - start
-            msg = f"TOOL TIMING: retrieve_context took {elapsed:.4f}s"
-            print(msg)
-            try:
-                self._tool_timings.append({"tool": "retrieve_context", "time": elapsed})
-            except Exception:
-                pass
+            cache = {"hit": "cache_lookup" in steps, **agent.store.query_cache_stats()}
+            agent._record_tool_timing("retrieve_context", time.perf_counter() - start, steps=steps, cache=cache)
             return serialized, retrieved_docs
 
         @tool(response_format="content")
@@ -100,13 +239,7 @@ class ESeimasAgent:
             """
             start = time.perf_counter()
             out = datetime.now().date().isoformat()
-            elapsed = time.perf_counter() - start
-            msg = f"TOOL TIMING: get_current_date took {elapsed:.6f}s"
-            print(msg)
-            try:
-                self._tool_timings.append({"tool": "get_current_date", "time": elapsed})
-            except Exception:
-                pass
+            agent._record_tool_timing("get_current_date", time.perf_counter() - start)
             return out
 
         @tool(response_format="content")
@@ -118,26 +251,19 @@ class ESeimasAgent:
             Atsakymas grąžinamas JSON formatu: sąrašas objektų su laukais "text" (pakeitimo aprašymas) ir "url" (nuoroda į pilną dokumento, kuris pakeitė šį dokumentą, tekstą).
             """
             start = time.perf_counter()
-            list_of_changes = agent.store.retrieve_list_of_changes(date)
+            list_of_changes, coalesced = agent._single_flight.do(
+                ("retrieve_law_changes", agent._edition_key(date)),
+                lambda: agent.store.retrieve_list_of_changes(date)
+            )
             if not list_of_changes:
                 out = "Nerasta jokių pakeitimų nurodytai datai galiojančiai redakcijai."
-                elapsed = time.perf_counter() - start
-                print(f"TOOL TIMING: retrieve_law_changes took {elapsed:.4f}s")
-                try:
-                    self._tool_timings.append({"tool": "retrieve_law_changes", "time": elapsed})
-                except Exception:
-                    pass
+                agent._record_tool_timing("retrieve_law_changes", time.perf_counter() - start, coalesced=coalesced)
                 return out
             serialized = json.dumps([
                 {"text": change["text"], "url": change["url"]}
                 for change in list_of_changes
             ], ensure_ascii=False, indent=2)
-            elapsed = time.perf_counter() - start
-            print(f"TOOL TIMING: retrieve_law_changes took {elapsed:.4f}s")
-            try:
-                self._tool_timings.append({"tool": "retrieve_law_changes", "time": elapsed})
-            except Exception:
-                pass
+            agent._record_tool_timing("retrieve_law_changes", time.perf_counter() - start, coalesced=coalesced)
             return serialized
 
         @tool(response_format="content")
@@ -147,42 +273,16 @@ class ESeimasAgent:
             Naudok šią funkciją, kai reikia gauti konkretaus dokumento turinį pagal URL.
             url: Dokumento URL.
             """
-            match = re.search(r'documentId=([a-fA-F0-9]+)', url)
-            if match:
-                doc_id = match.group(1)
-                url = f"https://www.e-tar.lt/rs/legalact/{doc_id}/"
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-                ),
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Referer": "https://e-seimas.lrs.lt/",
-                "Connection": "keep-alive",
-            }
             start = time.perf_counter()
-            resp = requests.get(url, timeout=30, headers=headers)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "lxml")
+            html, coalesced = agent._single_flight.do(("retrieve_law_text", url.strip()), lambda: agent.store.fetcher.fetch(url))
+            soup = BeautifulSoup(html, "lxml")
             root = soup.find("div", class_="WordSection1")
             if not root:
-                out = resp.text
-                elapsed = time.perf_counter() - start
-                print(f"TOOL TIMING: retrieve_law_text took {elapsed:.4f}s")
-                try:
-                    self._tool_timings.append({"tool": "retrieve_law_text", "time": elapsed})
-                except Exception:
-                    pass
+                out = html
+                agent._record_tool_timing("retrieve_law_text", time.perf_counter() - start, coalesced=coalesced)
                 return out
             out = root.get_text()
-            elapsed = time.perf_counter() - start
-            print(f"TOOL TIMING: retrieve_law_text took {elapsed:.4f}s")
-            try:
-                self._tool_timings.append({"tool": "retrieve_law_text", "time": elapsed})
-            except Exception:
-                pass
+            agent._record_tool_timing("retrieve_law_text", time.perf_counter() - start, coalesced=coalesced)
             return out
 
         @tool(response_format="content")
@@ -196,12 +296,7 @@ class ESeimasAgent:
             start = time.perf_counter()
             ranges = agent.store.resolve_ranges_of_available_editions()
             serialized = json.dumps(ranges, ensure_ascii=False, indent=2)
-            elapsed = time.perf_counter() - start
-            print(f"TOOL TIMING: retrieve_date_ranges_of_available_editions took {elapsed:.4f}s")
-            try:
-                self._tool_timings.append({"tool": "retrieve_date_ranges_of_available_editions", "time": elapsed})
-            except Exception:
-                pass
+            agent._record_tool_timing("retrieve_date_ranges_of_available_editions", time.perf_counter() - start)
             return serialized
 
         @tool(response_format="content")
@@ -214,50 +309,204 @@ class ESeimasAgent:
             Bus naudojama redakcija, galiojanti nurodytą datą.
             """
             start = time.perf_counter()
-            article_text = agent.store.resolve_full_document_by_article_no(
-                article_no,
-                date
+            article_text, coalesced = agent._single_flight.do(
+                ("retrieve_full_article_text_by_no", ArticleIndex.normalize_article_no(article_no), agent._edition_key(date)),
+                lambda: agent.store.resolve_full_document_by_article_no(article_no, date)
             )
-            elapsed = time.perf_counter() - start
-            print(f"TOOL TIMING: retrieve_full_article_text_by_no took {elapsed:.4f}s")
-            try:
-                self._tool_timings.append({"tool": "retrieve_full_article_text_by_no", "time": elapsed})
-            except Exception:
-                pass
+            agent._record_tool_timing("retrieve_full_article_text_by_no", time.perf_counter() - start, coalesced=coalesced)
             return article_text
 
+        @tool(response_format="content")
+        def retrieve_full_articles_by_nos(article_nos: List[str], dates: List[str]):
+            """
+            Grąžina kelių straipsnių tekstus kelioms datoms vienu kvietimu.
+            Naudok šią funkciją vietoje kelių retrieve_full_article_text_by_no kvietimų, kai reikia kelių straipsnių
+            arba to paties straipsnio skirtingomis datomis (pvz., skirtingais metais).
+            article_nos: Straipsnių numerių sąrašas (pvz., ["5", "12", "37(1)"]).
+            dates: Datų sąrašas ISO formatu (YYYY-MM-DD); datos, patenkančios į tą pačią redakciją, sujungiamos.
+            Atsakymas grąžinamas JSON formatu: "editions" – rastos redakcijos ir joms priskirtos datos,
+            "articles" – straipsniai pagal redakciją ("text" arba "same_text_as_edition", jei tekstas nepasikeitė nuo ankstesnės redakcijos),
+            "unresolved_dates" – datos, kurioms redakcija nerasta.
+            """
+            start = time.perf_counter()
+            articles = agent.store.resolve_articles(article_nos, dates)
+            serialized = json.dumps(articles, ensure_ascii=False, indent=2)
+            agent._record_tool_timing("retrieve_full_articles_by_nos", time.perf_counter() - start)
+            return serialized
+
+        @tool(response_format="content")
+        def retrieve_changes_between_dates(date_from: str, date_to: str, article_no: str = ""):
+            """
+            Palygina dvi redakcijas (galiojusias date_from ir date_to datomis) ir grąžina kompaktišką pakeitimų santrauką.
+            Naudok šią funkciją, kai reikia sužinoti, kas pasikeitė straipsnyje ar visame įstatyme tarp dviejų datų –
+            nereikia atskirai gauti abiejų straipsnio tekstų.
+            date_from: Ankstesnė data ISO formatu (YYYY-MM-DD).
+            date_to: Vėlesnė data ISO formatu (YYYY-MM-DD).
+            article_no: Straipsnio numeris (pvz., "5", "38-2", "37(1)"). Jei nenurodytas, lyginama visa redakcija.
+            Atsakymas grąžinamas JSON formatu: "status" (changed, unchanged, added, removed) ir "changes" – pakeistos pastraipos,
+            kur žodžių lygio skirtumai pažymėti [-pašalinta-] ir {+pridėta+}; lyginant visą redakciją – "added", "removed" ir "changed" straipsniai.
+            Jei duomenų bazėje yra keli teisės aktai, grąžinamas sąrašas – po vieną palyginimą kiekvienam aktui.
+            """
+            start = time.perf_counter()
+            key = (
+                "retrieve_changes_between_dates",
+                ArticleIndex.normalize_article_no(article_no) if article_no else "",
+                agent._edition_key(date_from),
+                agent._edition_key(date_to),
+            )
+            if article_no:
+                diffs, coalesced = agent._single_flight.do(key, lambda: agent.store.diff_article(article_no, date_from, date_to))
+            else:
+                diffs, coalesced = agent._single_flight.do(key, lambda: agent.store.diff_editions(date_from, date_to))
+            if not diffs:
+                out = "Nerasta redakcijų, galiojančių nurodytoms datoms."
+                agent._record_tool_timing("retrieve_changes_between_dates", time.perf_counter() - start, coalesced=coalesced)
+                return out
+            serialized = json.dumps(diffs[0] if len(diffs) == 1 else diffs, ensure_ascii=False, indent=2)
+            agent._record_tool_timing("retrieve_changes_between_dates", time.perf_counter() - start, coalesced=coalesced)
+            return serialized
+
         self.tools = [
             retrieve_context,
             get_current_date,
             retrieve_law_changes,
             retrieve_law_text,
             retrieve_date_ranges_of_available_editions,
-            retrieve_full_article_text_by_no
+            retrieve_full_article_text_by_no,
+            retrieve_full_articles_by_nos,
+            retrieve_changes_between_dates
         ]
+        # Async variants for aget_agent_response: the blocking Store/HTTP work runs in worker
+        # threads, so independent tool calls of one model step overlap on the event loop
+        for t in self.tools:
+            if t.coroutine is None:
+                t.coroutine = self._to_thread_coroutine(t.func)
 
-    def get_agent_response(self, message, parameters):
-        # clear previous tool timings and start total timer
-        import logging
-        self._tool_timings = []
-        total_start = time.perf_counter()
+    def _edition_key(self, date: str) -> str:
+        # Dates in the same editions return the same data, so they coalesce under the edition URLs
+        editions = self.store.resolve_editions(date)
+        return " ".join(sorted(edition.url for edition in editions)) if editions else date
 
-        step_times = {}
+    @staticmethod
+    def _to_thread_coroutine(func):
+        async def run(*args, **kwargs):
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return run
 
-        step_start = time.perf_counter()
-        model = init_chat_model(
-            f"openai:gpt-5-mini",
+    @staticmethod
+    def _begin_request(thread_id: str) -> float:
+        # Tool timings and rate limiter queue waits are collected per request; the conversation
+        # is the unit the limiter queues fairly
+        start = time.perf_counter()
+        queue_waits = begin_session_request(thread_id)
+        _request_timings.set({"start": start, "tool_timings": [], "queue_waits": queue_waits})
+        return start
+
+    @staticmethod
+    def _current_tool_timings() -> List[dict]:
+        timings = _request_timings.get()
+        return timings["tool_timings"] if timings is not None else []
+
+    def rate_limit_status(self) -> dict:
+        """Bendro pokalbių modelio ribotuvo būsena (eilės ilgis, apytikslis laukimas) UI perspėjimams."""
+        return self.rate_limiter.status()
+
+    def _record_tool_timing(self, tool_name: str, elapsed: float, **details) -> None:
+        timings = _request_timings.get()
+        end = time.perf_counter() - (timings["start"] if timings is not None else time.perf_counter())
+        print(f"TOOL TIMING: {tool_name} took {elapsed:.4f}s ({end - elapsed:.3f}s - {end:.3f}s)")
+        for step, step_elapsed in details.get("steps", {}).items():
+            print(f"TOOL TIMING: {tool_name}.{step} took {step_elapsed:.4f}s")
+        if timings is not None:
+            timings["tool_timings"].append({"tool": tool_name, "time": elapsed, "start": end - elapsed, "end": end, **details})
+
+    def _get_agent(self):
+        agent = self._agent
+        if agent is not None:
+            return agent
+        with self._agent_lock:
+            if self._agent is None:
+                self._agent = self._build_agent(get_shared_chat_model())
+            return self._agent
+
+    def _system_prompt(self) -> str:
+        # Static instructions first and the per-day/per-ingest part last, so the provider's
+        # prompt cache keeps matching the unchanged prefix
+        return (
+            self.prompts[-1]["content"] + "\n\n"
+            + self._get_edition_catalog() + "\n"
+            + f"Šiandienos data: {datetime.now().date().isoformat()}"
         )
-        step_times["init_chat_model"] = time.perf_counter() - step_start
 
-        step_start = time.perf_counter()
-        agent = create_agent(
+    def _get_edition_catalog(self) -> str:
+        catalog = self._edition_catalog
+        if catalog is None:
+            ranges = self.store.resolve_ranges_of_available_editions()
+            lines = [
+                f"- nuo {r['effective_from']}" + ("" if r["effective_to"] == "3000-00-00" else f" iki {r['effective_to']}")
+                for r in ranges
+            ]
+            catalog = "Prieinamos redakcijos:\n" + ("\n".join(lines) if lines else "- nėra")
+            self._edition_catalog = catalog
+        return catalog
+
+    def _invalidate_edition_catalog(self, urls: List[str]) -> None:
+        self._edition_catalog = None
+
+    def _build_agent(self, model):
+        @dynamic_prompt
+        def edition_context_prompt(request: ModelRequest) -> str:
+            return self._system_prompt()
+
+        return create_agent(
             model=model,
             system_prompt=self.prompts[-1]["content"],
             response_format=Response,
             checkpointer=self.checkpointer,
             tools=self.tools,
+            middleware=[
+                # Today's date and the edition catalog, so the model does not spend tool round trips on them
+                edition_context_prompt,
+                # Old turns are replaced by a summary in the saved state once the history gets too long;
+                # the summary call is the largest request, so it takes its turn in the shared limiter too
+                SummarizationMiddleware(
+                    model=RateLimitedChatModel(model=model, limiter=self.rate_limiter),
+                    trigger=("tokens", HISTORY_TOKEN_BUDGET),
+                    keep=("messages", 20),
+                ),
+                # Older tool outputs (law texts, articles) are dropped from the model request
+                ContextEditingMiddleware(edits=[
+                    ClearToolUsesEdit(
+                        trigger=TOOL_RESULTS_TOKEN_BUDGET,
+                        keep=3,
+                        placeholder="[Senas įrankio rezultatas pašalintas. Jei reikia, iškviesk įrankį dar kartą.]",
+                    ),
+                ]),
+                # Innermost, so the reservation covers the final request sent to OpenAI
+                RateLimitMiddleware(self.rate_limiter),
+            ],
         )
-        step_times["create_agent"] = time.perf_counter() - step_start
+
+    def get_agent_response(self, message, parameters):
+        # clear previous tool timings and start total timer
+        import logging
+        total_start = self._begin_request(parameters["thread_id"])
+
+        step_times = {}
+
+        step_start = time.perf_counter()
+        agent = self._get_agent()
+        step_times["get_agent"] = time.perf_counter() - step_start
+
+        cached, cache_slot = self._try_answer_cache(agent, message, parameters, step_times)
+        if cached is not None:
+            result, hit = cached
+            return self._build_response(result, step_times, total_start, answer_cache_hit=hit)
+
+        fast_path = self._try_fast_path(agent, message, parameters, step_times)
+        if fast_path is not None:
+            result, route = fast_path
+            return self._build_response(result, step_times, total_start, fast_path_route=route)
 
         step_start = time.perf_counter()
         result = agent.invoke(
@@ -266,6 +515,274 @@ class ESeimasAgent:
         )
         step_times["agent_invoke"] = time.perf_counter() - step_start
 
+        self._store_answer(message, cache_slot, result)
+        return self._build_response(result, step_times, total_start)
+
+    async def aget_agent_response(self, message, parameters):
+        """Asinchroninė get_agent_response versija: vieno žingsnio įrankių kvietimai vykdomi lygiagrečiai."""
+        total_start = self._begin_request(parameters["thread_id"])
+
+        step_times = {}
+
+        step_start = time.perf_counter()
+        agent = self._get_agent()
+        step_times["get_agent"] = time.perf_counter() - step_start
+
+        cached, cache_slot = await asyncio.to_thread(self._try_answer_cache, agent, message, parameters, step_times)
+        if cached is not None:
+            result, hit = cached
+            return self._build_response(result, step_times, total_start, answer_cache_hit=hit)
+
+        fast_path = await asyncio.to_thread(self._try_fast_path, agent, message, parameters, step_times)
+        if fast_path is not None:
+            result, route = fast_path
+            return self._build_response(result, step_times, total_start, fast_path_route=route)
+
+        step_start = time.perf_counter()
+        result = await agent.ainvoke(
+            {"messages": [message]},
+            config={"configurable": {"thread_id": parameters["thread_id"]}}
+        )
+        step_times["agent_invoke"] = time.perf_counter() - step_start
+
+        await asyncio.to_thread(self._store_answer, message, cache_slot, result)
+        return self._build_response(result, step_times, total_start)
+
+    def stream_agent_response(self, message, parameters):
+        """
+        Streaming'inė get_agent_response versija. Generatorius grąžina įvykius:
+        {"type": "tool_call", "name", "args"} – modelis kviečia įrankį,
+        {"type": "tool_result", "name"} – įrankis baigė darbą,
+        {"type": "paragraphs", "paragraphs"} – iki šiol sugeneruotos (dalinės) atsakymo pastraipos,
+        {"type": "final", "response"} – galutinis rezultatas, toks pat kaip get_agent_response.
+        """
+        total_start = self._begin_request(parameters["thread_id"])
+
+        step_times = {}
+
+        step_start = time.perf_counter()
+        agent = self._get_agent()
+        step_times["get_agent"] = time.perf_counter() - step_start
+
+        cached, cache_slot = self._try_answer_cache(agent, message, parameters, step_times)
+        if cached is not None:
+            result, hit = cached
+            response = self._build_response(result, step_times, total_start, answer_cache_hit=hit)
+            yield {"type": "paragraphs", "paragraphs": [p.model_dump() for p in response["output_parsed"].paragraphs]}
+            yield {"type": "final", "response": response}
+            return
+
+        fast_path = self._try_fast_path(agent, message, parameters, step_times)
+        if fast_path is not None:
+            result, route = fast_path
+            response = self._build_response(result, step_times, total_start, fast_path_route=route)
+            yield {"type": "paragraphs", "paragraphs": [p.model_dump() for p in response["output_parsed"].paragraphs]}
+            yield {"type": "final", "response": response}
+            return
+
+        config = {"configurable": {"thread_id": parameters["thread_id"]}}
+        # Structured answer JSON arrives either as message content (provider strategy)
+        # or as arguments of the Response tool call (tool strategy)
+        answer_json = ""
+        answer_tool_args = {}
+        last_paragraphs = None
+
+        step_start = time.perf_counter()
+        for mode, chunk in agent.stream(
+            {"messages": [message]},
+            config=config,
+            stream_mode=["updates", "messages"],
+        ):
+            if mode == "messages":
+                msg, metadata = chunk
+                if metadata.get("langgraph_node") != "model":
+                    continue
+                if isinstance(msg.content, str):
+                    answer_json += msg.content
+                else:
+                    answer_json += "".join(
+                        block.get("text", "") for block in msg.content
+                        if isinstance(block, dict) and block.get("type") == "text"
+                    )
+                for tool_chunk in getattr(msg, "tool_call_chunks", None) or []:
+                    index = tool_chunk.get("index") or 0
+                    entry = answer_tool_args.setdefault(index, {"name": "", "args": ""})
+                    entry["name"] += tool_chunk.get("name") or ""
+                    entry["args"] += tool_chunk.get("args") or ""
+                partial = answer_json or "".join(
+                    entry["args"] for entry in answer_tool_args.values() if entry["name"] == Response.__name__
+                )
+                paragraphs = self._parse_partial_paragraphs(partial)
+                if paragraphs and paragraphs != last_paragraphs:
+                    if last_paragraphs is None:
+                        step_times["first_output"] = time.perf_counter() - total_start
+                    last_paragraphs = paragraphs
+                    yield {"type": "paragraphs", "paragraphs": paragraphs}
+            else:
+                for node, update in chunk.items():
+                    if not isinstance(update, dict):
+                        continue
+                    for msg in update.get("messages", []):
+                        if node == "model":
+                            # A new model call starts; reset partial answer buffers
+                            answer_json = ""
+                            answer_tool_args = {}
+                            for call in getattr(msg, "tool_calls", None) or []:
+                                if call["name"] != Response.__name__:
+                                    yield {"type": "tool_call", "name": call["name"], "args": call["args"]}
+                        elif node == "tools" and getattr(msg, "type", None) == "tool":
+                            yield {"type": "tool_result", "name": msg.name}
+        step_times["agent_invoke"] = time.perf_counter() - step_start
+
+        result = agent.get_state(config).values
+        self._store_answer(message, cache_slot, result)
+        yield {"type": "final", "response": self._build_response(result, step_times, total_start)}
+
+    @staticmethod
+    def _parse_partial_paragraphs(partial_json: str) -> Optional[List[dict]]:
+        if not partial_json:
+            return None
+        try:
+            parsed = parse_partial_json(partial_json)
+        except Exception:
+            return None
+        if not isinstance(parsed, dict) or not isinstance(parsed.get("paragraphs"), list):
+            return None
+        paragraphs = []
+        for para in parsed["paragraphs"]:
+            if not isinstance(para, dict) or not isinstance(para.get("content"), str):
+                continue
+            references = para.get("references") or []
+            paragraphs.append({
+                "content": para["content"],
+                "references": [ref for ref in references if isinstance(ref, str)] if isinstance(references, list) else [],
+            })
+        return paragraphs or None
+
+    def _try_fast_path(self, agent, message, parameters, step_times):
+        """
+        Bando atsakyti be agento ciklo (žr. FastPathRouter). Pavykus klausimas ir atsakymas
+        įrašomi į pokalbio checkpoint'ą, kad tolesni agento žingsniai matytų visą istoriją.
+        Grąžina (būsena, maršrutas) arba None, jei užklausą turi apdoroti agentas.
+        """
+        step_start = time.perf_counter()
+        text = self._message_text(message)
+        match = self.router.route(text, datetime.now().date().isoformat())
+        if match is None:
+            step_times["fast_path_route"] = time.perf_counter() - step_start
+            return None
+
+        if match.route == "editions":
+            response = self._answer_editions(match)
+            ai_message = AIMessage(content=json.dumps(response.model_dump(), ensure_ascii=False))
+        else:
+            response, ai_message = self._answer_article(text, match)
+        if response is None:
+            step_times["fast_path_route"] = time.perf_counter() - step_start
+            return None
+
+        result = self._append_turn(agent, parameters, text, ai_message, response)
+        step_times["fast_path"] = time.perf_counter() - step_start
+        return result, match.route
+
+    def _try_answer_cache(self, agent, message, parameters, step_times):
+        """
+        Ieško panašaus, jau atsakyto klausimo su tais pačiais skaičiais tos pačios redakcijos
+        atsakymų cache'e (žr. AnswerCache). Grąžina ((būsena, pataikymas), None) pataikius,
+        kitaip (None, vieta arba None) – redakcija, skaičių raktas ir redakcijos karta, kuriems
+        išsaugoti agento atsakymą. Naudojamas tik naujų pokalbių pirmajam klausimui, nes vėlesnių atsakymai
+        priklauso nuo ankstesnių žinučių.
+        """
+        step_start = time.perf_counter()
+        config = {"configurable": {"thread_id": parameters["thread_id"]}}
+        if agent.get_state(config).values.get("messages"):
+            return None, None
+
+        text = self._message_text(message)
+        date = self.router.resolve_date(text, datetime.now().date().isoformat())
+        editions = self.store.resolve_editions(date) if date is not None else []
+        # Answers are cached per edition, so only when the date maps to a single act's edition
+        if len(editions) != 1:
+            return None, None
+        # The generation is taken before the lookup, so an answer computed across an import is not stored
+        url = editions[0].url
+        slot = {"edition_url": url, "numbers": self.router.numeric_key(text), "generation": self.answer_cache.generation(url)}
+
+        entry = self.answer_cache.lookup(text, slot["edition_url"], slot["numbers"])
+        if entry is None:
+            step_times["answer_cache"] = time.perf_counter() - step_start
+            return None, slot
+
+        response = Response.model_validate(entry["response"])
+        ai_message = AIMessage(content=json.dumps(entry["response"], ensure_ascii=False))
+        result = self._append_turn(agent, parameters, text, ai_message, response)
+        step_times["answer_cache"] = time.perf_counter() - step_start
+        hit = {"question": entry["question"], "similarity": entry["similarity"], "edition_url": slot["edition_url"]}
+        return (result, hit), None
+
+    def _store_answer(self, message, slot: Optional[dict], result) -> None:
+        if slot is None or result.get("structured_response") is None:
+            return
+        self.answer_cache.put(
+            self._message_text(message),
+            slot["edition_url"],
+            slot["numbers"],
+            result["structured_response"].model_dump(),
+            slot["generation"],
+        )
+
+    @staticmethod
+    def _message_text(message) -> str:
+        return message["content"] if isinstance(message, dict) else message.content
+
+    @staticmethod
+    def _append_turn(agent, parameters, text: str, ai_message: AIMessage, response: Response):
+        # Answers produced outside the agent loop are written to the checkpoint as a normal turn,
+        # so follow-up questions and cumulative token usage see them
+        config = {"configurable": {"thread_id": parameters["thread_id"]}}
+        agent.update_state(
+            config,
+            {"messages": [HumanMessage(content=text), ai_message], "structured_response": response},
+            as_node="model",
+        )
+        return agent.get_state(config).values
+
+    @staticmethod
+    def _answer_editions(match: FastPathMatch) -> Response:
+        lines = [r["title"] for r in match.ranges]
+        return Response(paragraphs=[Paragraph(content="Prieinamos įstatymo redakcijos:\n" + "\n".join(lines))])
+
+    def _answer_article(self, text: str, match: FastPathMatch):
+        document = match.document
+        source = document.metadata.get("reference") or document.metadata.get("url")
+        model = get_shared_chat_model().with_structured_output(Response, include_raw=True)
+        messages = [
+            SystemMessage(content=self._system_prompt()),
+            HumanMessage(content=(
+                f"Straipsnio {match.article_no} tekstas (redakcija, galiojanti {match.date}, šaltinis {source}):\n"
+                f"{document.page_content}\n\n"
+                f"Vartotojo klausimas: {text}"
+            )),
+        ]
+        estimate = count_tokens_approximately(messages) + CHAT_OUTPUT_TOKENS_ESTIMATE
+        self.rate_limiter.acquire(estimate)
+        output = model.invoke(messages)
+        raw = output["raw"]
+        used = (getattr(raw, "usage_metadata", None) or {}).get("total_tokens", 0)
+        if used:
+            self.rate_limiter.adjust(used - estimate)
+        response = output.get("parsed")
+        if response is None:
+            return None, None
+        # Usage metadata kept on the stored message, so cumulative token usage stays correct
+        ai_message = AIMessage(
+            content=json.dumps(response.model_dump(), ensure_ascii=False),
+            usage_metadata=getattr(raw, "usage_metadata", None),
+            response_metadata=getattr(raw, "response_metadata", {}) or {},
+        )
+        return response, ai_message
+
+    def _build_response(self, result, step_times, total_start, fast_path_route=None, answer_cache_hit=None):
         step_start = time.perf_counter()
         for msg in result["messages"]:
             msg.pretty_print()
@@ -283,6 +800,11 @@ class ESeimasAgent:
             execution_trace.append(pretty_text)
             buf.truncate(0)
             buf.seek(0)
+        if answer_cache_hit is not None:
+            execution_trace.append(
+                f"Atsakymas paimtas iš atsakymų cache'o (panašumas {answer_cache_hit['similarity']:.3f}, "
+                f"klausimas: „{answer_cache_hit['question']}“, redakcija: {answer_cache_hit['edition_url']})"
+            )
         step_times["execution_trace"] = time.perf_counter() - step_start
 
         step_start = time.perf_counter()
@@ -299,8 +821,15 @@ class ESeimasAgent:
         )
         step_times["token_usage"] = time.perf_counter() - step_start
 
+        queue_waits = (_request_timings.get() or {}).get("queue_waits", [])
+        step_times["queue_wait"] = sum(w["wait"] for w in queue_waits)
+
         total_elapsed = time.perf_counter() - total_start
         print(f"FUNCTION TIMING: get_agent_response took {total_elapsed:.4f}s")
+        if fast_path_route is not None:
+            self.router.record_fast_path(fast_path_route, total_elapsed)
+        elif answer_cache_hit is None:
+            self.router.record_agent(total_elapsed)
 
         print(f"Number of steps in step_times: {len(step_times)}")
         # Log step timings
@@ -314,7 +843,10 @@ class ESeimasAgent:
             "token_usage": token_usage,
             "timings": {
                 "total_time": total_elapsed,
-                "tool_timings": self._tool_timings,
+                "tool_timings": self._current_tool_timings(),
                 "step_timings": step_times,
+                "fast_path": {"route": fast_path_route, **self.router.stats()},
+                "rate_limit": {"queued_calls": len(queue_waits), **self.rate_limiter.status()},
+                "answer_cache": {"hit": answer_cache_hit, **self.answer_cache.stats()},
             },
         }
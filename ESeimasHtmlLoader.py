@@ -1,11 +1,25 @@
+from copy import deepcopy
+from dataclasses import dataclass
 from datetime import date
-from typing import List, Optional
+from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-import requests
 from bs4 import BeautifulSoup, Tag
 from langchain_core.documents import Document
+from lxml import etree
 import re
 
+from DocumentSnapshotStore import DocumentSnapshotStore
+from HttpFetcher import HttpFetcher, get_shared_fetcher
+
+@dataclass
+class PartInfo:
+    """Vieno div#part... mazgo analizės rezultatas, apskaičiuojamas vieną kartą."""
+    title: str
+    article_no: Optional[str]
+    has_article: bool
+
+
 class ESeimasHtmlLoader:
     """
     Iš e-seimas.lrs.lt HTML struktūros (div.WordSection1 > div#part...)
@@ -13,24 +27,75 @@ class ESeimasHtmlLoader:
 
     - Iki max_depth kuria atskirus dokumentus (vienas Document per div#part...).
     - Gildesnius nei max_depth part'us sukrauna į artimiausio viršaus dokumento tekstą.
+
+    Parsinimo būdai (backend):
+    - "soup": visas dokumentas įkeliamas į vieną BeautifulSoup medį.
+    - "stream": lxml iterparse po vieną skaito aukščiausio lygio div#part...,
+      paverčia jį dokumentais ir iškart atlaisvina. Rezultatas identiškas "soup".
     """
 
+    BACKENDS = ("soup", "stream")
+
+    # Didinti, kai pasikeičia parsinimo rezultatas – senos momentinės kopijos tada ignoruojamos
+    PARSER_VERSION = 2
+
+    # "stream" būdu jau apdoroti ir iki antraštės sutraukti div#part... pažymimi šiuo atributu
+    _HAS_ARTICLE_ATTR = "data-has-article"
+
+    def __init__(
+        self,
+        fetcher: Optional[HttpFetcher] = None,
+        backend: str = "soup",
+        snapshots: Optional[DocumentSnapshotStore] = None,
+    ):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Nežinomas parsinimo būdas: {backend}")
+        self.fetcher = fetcher or get_shared_fetcher()
+        self.backend = backend
+        # Jei nurodyta, nepasikeitusio HTML redakcijos neparsinamos iš naujo
+        self.snapshots = snapshots
+        # id(div#part...) -> PartInfo; galioja tik vieno parse() kvietimo metu
+        self._part_info: Dict[int, PartInfo] = {}
+
     def load(self, portal_url: str) -> List[Document]:
         """Atsisiunčia HTML iš URL ir grąžina dokumentų sąrašą."""
         try:
-            document_url = portal_url.replace("portal/legalAct/lt/TAD", "rs/actualedition") + "/"
-
-            html = self._download(document_url)
+            html = self._download(self._to_document_url(portal_url))
         except Exception as e:
             print(f"Failed to download HTML from {e}")
             raise
 
+        return self._parse_or_restore(html, portal_url)
+
+    def load_many(self, portal_urls: Iterable[str]) -> Iterator[Tuple[str, List[Document]]]:
+        """
+        Atsisiunčia kelias redakcijas lygiagrečiai ir grąžina (portal_url, dokumentai) poras.
+        Kiekviena redakcija apdorojama iškart, kai tik ji atsisiunčiama, todėl
+        poros grąžinamos atsisiuntimo pabaigos tvarka, o ne pateikta tvarka.
+        """
+        by_document_url = {self._to_document_url(u): u for u in portal_urls}
+        for document_url, html in self.fetcher.fetch_many(by_document_url):
+            portal_url = by_document_url[document_url]
+            yield portal_url, self._parse_or_restore(html, portal_url)
+
+    def parse(self, html: str, portal_url: str) -> List[Document]:
+        """Iš jau atsisiųsto HTML padaro dokumentų sąrašą."""
+        try:
+            if self.backend == "stream":
+                return self._parse_stream(html, portal_url)
+            return self._parse_soup(html, portal_url)
+        finally:
+            self._part_info = {}
+
+    def _parse_soup(self, html: str, portal_url: str) -> List[Document]:
         soup = BeautifulSoup(html, "lxml")
 
         root = soup.find("div", class_="WordSection1")
         if root is None:
             raise ValueError("Neradau div.WordSection1 – HTML struktūra gal pasikeitė?")
 
+        self._part_info = self._analyze_parts(root)
+
         docs: List[Document] = []
 
         top_parts = root.find_all(self._is_part_div, recursive=False)
@@ -51,8 +116,178 @@ class ESeimasHtmlLoader:
 
         return docs
 
+    def _parse_stream(self, html: str, portal_url: str) -> List[Document]:
+        """
+        Skaito HTML su lxml iterparse. Kai užsidaro div#part..., iš kurio "soup" būdas
+        kurtų atskirą Document, tik to mazgo poaibis paverčiamas BeautifulSoup medžiu
+        ir apdorojamas tais pačiais metodais. Po to mazgas sutraukiamas iki antraštės
+        (tėvui reikia tik jos), o aukščiausio lygio mazgai išvalomi visiškai.
+        Dokumentai rikiuojami pagal mazgų pradžios tvarką – kaip _walk_part rekursijoje.
+        """
+        events = etree.iterparse(
+            BytesIO(html.encode("utf-8")),
+            events=("start", "end"),
+            html=True,
+            encoding="utf-8",
+            huge_tree=True,
+        )
+
+        ordered_docs: List[Tuple[int, Document]] = []
+        start_order: Dict[etree._Element, int] = {}
+        titles: Dict[etree._Element, str] = {}
+        section = None
+        effective_dates: Optional[tuple[Optional[str], Optional[str]]] = None
+
+        for event, elem in events:
+            if section is None:
+                if event == "start" and elem.tag == "div" and "WordSection1" in (elem.get("class") or "").split():
+                    section = elem
+                continue
+            if event == "start":
+                if self._is_part_element(elem):
+                    start_order[elem] = len(start_order)
+                continue
+            if elem is section:
+                break
+
+            if self._is_part_element(elem):
+                ancestors = self._part_ancestors(elem, section)
+                # Part'ai be straipsnių lieka medyje ir parsinami vieną kartą kartu su
+                # artimiausiu protėviu, iš kurio kuriamas dokumentas
+                if ancestors is not None and (not ancestors or self._stream_has_article(elem)):
+                    part_soup = BeautifulSoup(
+                        etree.tostring(elem, encoding="unicode", method="html", with_tail=False), "lxml"
+                    )
+                    part_div = part_soup.find(self._is_part_div)
+                    self._part_info = self._analyze_parts(part_soup)
+                    if not ancestors and effective_dates is None:
+                        effective_dates = self._resolve_effective_dates([part_div])
+                    parent_headings = [self._stream_part_title(a, titles) for a in reversed(ancestors)]
+                    doc = self._create_part_document(part_div, parent_headings, portal_url)
+                    if doc is not None:
+                        ordered_docs.append((start_order[elem], doc))
+                    self._reduce_to_header(elem)
+                    self._part_info = {}
+                titles.pop(elem, None)
+
+            # Atlaisvinam jau apdorotą WordSection1 turinį
+            if elem.getparent() is section:
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del section[0]
+
+        if section is None:
+            raise ValueError("Neradau div.WordSection1 – HTML struktūra gal pasikeitė?")
+
+        ordered_docs.sort(key=lambda x: x[0])
+        docs = [doc for _, doc in ordered_docs]
+        effective_from, effective_to = effective_dates or (None, None)
+        for doc in docs:
+            doc.metadata["effective_from"] = self.date_str_to_int(effective_from)
+            doc.metadata["effective_to"] = self.date_str_to_int(effective_to)
+        return docs
+
+    @staticmethod
+    def _is_part_element(elem: etree._Element) -> bool:
+        return elem.tag == "div" and str(elem.get("id", "")).startswith("part")
+
+    def _part_ancestors(self, elem: etree._Element, section: etree._Element) -> Optional[List[etree._Element]]:
+        """
+        Grąžina div#part... protėvius iki WordSection1 (artimiausias pirmas).
+        None – jei grandinėje yra ne div#part... mazgas: tada _walk_part iki šio mazgo nenueitų.
+        """
+        ancestors = []
+        parent = elem.getparent()
+        while parent is not section:
+            if parent is None or not self._is_part_element(parent):
+                return None
+            ancestors.append(parent)
+            parent = parent.getparent()
+        return ancestors
+
+    def _stream_has_article(self, elem: etree._Element) -> bool:
+        """
+        Ar div#part... yra straipsnis, ar jame yra straipsnis – kaip _analyze_parts, bet
+        parsinant tik antraštę: vaikai su straipsniais jau sutraukti ir pažymėti atributu.
+        """
+        if any(self._is_part_element(child) and child.get(self._HAS_ARTICLE_ATTR) == "1" for child in elem):
+            return True
+        title = self._compute_part_div_title(self._stream_header_div(elem))
+        return self._article_no_from_title(title) is not None
+
+    def _stream_header_div(self, elem: etree._Element) -> Tag:
+        header = etree.Element(elem.tag, attrib=dict(elem.attrib))
+        for child in self._leading_p_elements(elem):
+            header.append(deepcopy(child))
+        header_soup = BeautifulSoup(etree.tostring(header, encoding="unicode", method="html"), "lxml")
+        return header_soup.find(self._is_part_div)
+
+    def _stream_part_title(self, elem: etree._Element, titles: Dict[etree._Element, str]) -> str:
+        # Atviro protėvio antraštės <p> jau pilnai perskaityti, nes eina prieš vaikus
+        if elem not in titles:
+            header_div = self._stream_header_div(elem)
+            # Kaip ir "soup" būdu: tėvo antraštė imama jau po _get_full_text nuorodų perrašymo
+            for p in header_div.find_all("p", recursive=False):
+                if p.find("i") is None:
+                    self._normalize_sup(p)
+                    self._rewrite_links(p)
+            titles[elem] = self._compute_part_div_title(header_div)
+        return titles[elem]
+
+    def _reduce_to_header(self, elem: etree._Element) -> None:
+        # Tėvo tekstui reikia tik šio mazgo antraštės ir žinios, kad jame yra straipsnis
+        header = self._leading_p_elements(elem)
+        for child in list(elem):
+            if not any(child is h for h in header):
+                elem.remove(child)
+        elem.set(self._HAS_ARTICLE_ATTR, "1")
+
+    @staticmethod
+    def _leading_p_elements(elem: etree._Element) -> List[etree._Element]:
+        leading = []
+        for child in elem:
+            if not isinstance(child.tag, str):
+                continue  # komentarai ir pan.
+            if child.tag != "p":
+                break
+            leading.append(child)
+        return leading
+
     # --- vidinės pagalbinės funkcijos ---
 
+    def _parse_or_restore(self, html: str, portal_url: str) -> List[Document]:
+        if self.snapshots is None:
+            return self.parse(html, portal_url)
+
+        content_hash = self.snapshots.content_hash(html)
+        docs = self.snapshots.load(portal_url, content_hash, self.PARSER_VERSION)
+        if docs is not None:
+            print(f" - {portal_url} unchanged, restored {len(docs)} documents from snapshot.")
+            return docs
+
+        docs = self.parse(html, portal_url)
+        self.snapshots.save(portal_url, content_hash, self.PARSER_VERSION, docs)
+        return docs
+
+    def _analyze_parts(self, root: Tag) -> Dict[int, PartInfo]:
+        """
+        Vienu praėjimu iš apačios į viršų apskaičiuoja kiekvieno div#part... antraštę,
+        straipsnio numerį ir ar jame (ar jo vaikuose) yra straipsnis.
+        find_all grąžina mazgus dokumento tvarka, todėl apvertus sąrašą
+        vaikai visada apdorojami anksčiau nei tėvai.
+        """
+        info: Dict[int, PartInfo] = {}
+        for part_div in reversed(root.find_all(self._is_part_div)):
+            title = self._compute_part_div_title(part_div)
+            article_no = self._article_no_from_title(title)
+            has_article = article_no is not None or part_div.get(self._HAS_ARTICLE_ATTR) == "1" or any(
+                info[id(child)].has_article
+                for child in part_div.children
+                if self._is_part_div(child)
+            )
+            info[id(part_div)] = PartInfo(title, article_no, has_article)
+        return info
+
     def _resolve_effective_dates(self, top_parts: List[Tag]) -> tuple[Optional[str], Optional[str]]:
         if len(top_parts) == 0:
             return (None, None)
@@ -83,22 +318,12 @@ class ESeimasHtmlLoader:
         
         return (None, None)
 
+    @staticmethod
+    def _to_document_url(portal_url: str) -> str:
+        return portal_url.replace("portal/legalAct/lt/TAD", "rs/actualedition") + "/"
+
     def _download(self, url: str) -> str:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Referer": "https://e-seimas.lrs.lt/",
-            "Connection": "keep-alive",
-        }
-        resp = requests.get(url, timeout=30, headers=headers)
-        resp.raise_for_status()
-        resp.encoding = resp.apparent_encoding or "utf-8"
-        return resp.text
+        return self.fetcher.fetch(url)
 
     @staticmethod
     def _is_part_div(tag: Tag) -> bool:
@@ -131,28 +356,9 @@ class ESeimasHtmlLoader:
         ] 
 
         # If not all children are separate documents, create a Document for this part
-       
-        text_chunks: List[str] = []
-        text_chunks.extend(self._get_full_text(part_div))
-        content = "\n".join(t for t in parent_headings + text_chunks if t).strip()
-
-        if content:
-            docs.append(
-                Document(
-                    page_content=content,
-                    metadata={
-                        "id": str(part_div.get("id")),
-                        "url": url,
-                        "reference": url + "#" + str(part_div.get("id")),
-                        "heararchy": " > ".join(parent_headings),
-                        "title": self._extract_part_div_title(part_div),
-                        "article_no": self._extract_part_div_article_no(part_div),
-                        #"change_history": self._extract_change_history(part_div),
-                        "effective_from": self.date_str_to_int(effective_from),
-                        "effective_to": self.date_str_to_int(effective_to),
-                    }
-                )
-            )
+        doc = self._create_part_document(part_div, parent_headings, url, effective_from, effective_to)
+        if doc is not None:
+            docs.append(doc)
 
         # This is reached when all children are separate documents
         for child_part in children_parts:
@@ -167,6 +373,37 @@ class ESeimasHtmlLoader:
                     effective_to=effective_to
                 )
 
+    def _create_part_document(
+        self,
+        part_div: Tag,
+        parent_headings: List[str],
+        url: str,
+        effective_from: Optional[str] = None,
+        effective_to: Optional[str] = None
+    ) -> Optional[Document]:
+        text_chunks: List[str] = []
+        text_chunks.extend(self._get_full_text(part_div))
+        self._refresh_part_title(part_div)
+        content = "\n".join(t for t in parent_headings + text_chunks if t).strip()
+
+        if not content:
+            return None
+
+        return Document(
+            page_content=content,
+            metadata={
+                "id": str(part_div.get("id")),
+                "url": url,
+                "reference": url + "#" + str(part_div.get("id")),
+                "heararchy": " > ".join(parent_headings),
+                "title": self._extract_part_div_title(part_div),
+                "article_no": self._extract_part_div_article_no(part_div),
+                #"change_history": self._extract_change_history(part_div),
+                "effective_from": self.date_str_to_int(effective_from),
+                "effective_to": self.date_str_to_int(effective_to),
+            }
+        )
+
     def date_str_to_int(self, date_str):
         if date_str is None:
             return 30000000  # far future
@@ -189,12 +426,7 @@ class ESeimasHtmlLoader:
                 and child.find("i") is None # skip change history
             ):
                 self._normalize_sup(child)
-                # Replace <a> tags with text[href="url"]
-                for a in child.find_all("a"):
-                    link_text = a.get_text(strip=True)
-                    href = a.get("href", "")
-                    replacement = f'{link_text}[href="{href}"]' if href else link_text
-                    a.replace_with(replacement)
+                self._rewrite_links(child)
                 text = child.get_text("", strip=False)
                 if text.strip():
                     result.append(text.strip())
@@ -209,6 +441,25 @@ class ESeimasHtmlLoader:
 
         return result
     
+    def _rewrite_links(self, p_tag: Tag) -> None:
+        # Replace <a> tags with text[href="url"]
+        for a in p_tag.find_all("a"):
+            link_text = a.get_text(strip=True)
+            href = a.get("href", "")
+            replacement = f'{link_text}[href="{href}"]' if href else link_text
+            a.replace_with(replacement)
+
+    def _refresh_part_title(self, part_div: Tag) -> None:
+        """
+        _get_full_text perrašo antraštės nuorodas, todėl dokumento ir vaikų antraštėms
+        naudojamas pavadinimas perskaičiuojamas iš jau perrašyto medžio.
+        """
+        info = self._part_info.get(id(part_div))
+        if info is None:
+            return
+        title = self._compute_part_div_title(part_div)
+        self._part_info[id(part_div)] = PartInfo(title, self._article_no_from_title(title), info.has_article)
+
     def _normalize_sup(self, p_tag: Tag) -> None:
         # Replace <sup> tags with -{text} in the text
         for sup in p_tag.find_all("sup"):
@@ -305,6 +556,10 @@ class ESeimasHtmlLoader:
         """
         Patikrinam ar straipsnis. Skaidom iki straipsnio lygio.
         """
+        info = self._part_info.get(id(part_div))
+        if info is not None:
+            return info.has_article
+
         if self._extract_part_div_article_no(part_div) is not None:
             return True
 
@@ -318,6 +573,15 @@ class ESeimasHtmlLoader:
         return False
     
     def _extract_part_div_title(self, part_div: Tag) -> str:
+        """
+        Grąžina part_div antraštę (iš _analyze_parts rezultatų, jei jie yra).
+        """
+        info = self._part_info.get(id(part_div))
+        if info is not None:
+            return info.title
+        return self._compute_part_div_title(part_div)
+
+    def _compute_part_div_title(self, part_div: Tag) -> str:
         """
         Ištraukia part_div antraštę (p.MsoNormal su bold tekstu).
         """
@@ -351,8 +615,13 @@ class ESeimasHtmlLoader:
         Ištraukia part_div straipsnio numerį iš antraštės.
         Grąžina None jei nėra straipsnio numerio.
         """
-        title = self._extract_part_div_title(part_div)
+        info = self._part_info.get(id(part_div))
+        if info is not None:
+            return info.article_no
+        return self._article_no_from_title(self._compute_part_div_title(part_div))
 
+    @staticmethod
+    def _article_no_from_title(title: str) -> Optional[str]:
         m = re.match(r"^(\d+(?:[.-]\d+|\(\d+\))*) straipsnis", title.lower())
         if m:
             return m.group(1)
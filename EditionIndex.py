@@ -0,0 +1,106 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+
+
+@dataclass(frozen=True)
+class Edition:
+    """Viena suvestinė redakcija. Redakcijos id – jos URL (chunk'ų metadata "url")."""
+
+    url: str
+    effective_from: int
+    effective_to: int
+
+    @property
+    def id(self) -> str:
+        return self.url
+
+    @property
+    def act(self) -> str:
+        """Teisės akto id – redakcijos URL be paskutinės dalies (.../TAD/<aktas>/<redakcija>)."""
+        return self.url.rstrip("/").rsplit("/", 1)[0]
+
+    def contains(self, date_int: int) -> bool:
+        return self.effective_from <= date_int <= self.effective_to
+
+
+class EditionIndex:
+    """
+    Redakcijų galiojimo intervalų indeksas atmintyje: data (YYYYMMDD int) -> redakcijos.
+
+    Sudaromas iš kiekvieno dokumento pirmojo chunk'o metadata (vienas Chroma get),
+    todėl tolesnės užklausos gali filtruoti vien pagal "url". Redakcijos grupuojamos
+    pagal teisės aktą: toje pačioje bazėje gali būti keli aktai, ir tą pačią dieną
+    kiekvienas jų turi savo galiojančią redakciją.
+    Indeksas nekeičiamas – po importo sukuriamas naujas ir pakeičiamas visas.
+    """
+
+    def __init__(self, editions: List[Edition]):
+        self._editions = sorted(editions, key=lambda e: (e.effective_from, e.effective_to))
+        # aktas -> (jo redakcijos, jų pradžios datos)
+        self._acts: Dict[str, Tuple[List[Edition], List[int]]] = {}
+        for edition in self._editions:
+            act_editions, starts = self._acts.setdefault(edition.act, ([], []))
+            act_editions.append(edition)
+            starts.append(edition.effective_from)
+
+    @classmethod
+    def from_vector_store(cls, vector_store: Chroma) -> "EditionIndex":
+        result = vector_store.get(where={"chunk_number": {"$eq": 1}}, include=["metadatas"])
+        editions = {}
+        for meta in result["metadatas"]:
+            url = meta.get("url")
+            eff_from = meta.get("effective_from")
+            eff_to = meta.get("effective_to")
+            if not url or url in editions or eff_from is None or eff_to is None:
+                continue
+            editions[url] = Edition(url=url, effective_from=int(eff_from), effective_to=int(eff_to))
+        return cls(list(editions.values()))
+
+    def resolve_all(self, date_int: int) -> List[Edition]:
+        """Kiekvieno akto redakcija, galiojanti nurodytą dieną; vėliausiai prasidėjusios pirmos."""
+        found = []
+        for act_editions, starts in self._acts.values():
+            edition = self._resolve_in(act_editions, starts, date_int)
+            if edition is not None:
+                found.append(edition)
+        return sorted(found, key=lambda e: (e.effective_from, e.effective_to), reverse=True)
+
+    def resolve_in_act(self, act: str, date_int: int) -> Optional[Edition]:
+        """Nurodyto akto redakcija, galiojanti nurodytą dieną, arba None."""
+        editions = self._acts.get(act)
+        if editions is None:
+            return None
+        return self._resolve_in(*editions, date_int)
+
+    def previous(self, edition: Edition) -> Optional[Edition]:
+        """To paties akto redakcija, galiojusi dieną prieš nurodytos redakcijos įsigaliojimą."""
+        return self.resolve_in_act(edition.act, self._day_before(edition.effective_from))
+
+    def by_act(self) -> Dict[str, List[Edition]]:
+        """Kiekvieno akto redakcijos, surikiuotos pagal įsigaliojimą."""
+        return {act: list(editions) for act, (editions, _) in self._acts.items()}
+
+    def __iter__(self) -> Iterator[Edition]:
+        return iter(self._editions)
+
+    def __len__(self) -> int:
+        return len(self._editions)
+
+    @staticmethod
+    def _resolve_in(editions: List[Edition], starts: List[int], date_int: int) -> Optional[Edition]:
+        i = bisect_right(starts, date_int) - 1
+        # Persidengiančių intervalų atveju pirmenybė vėliausiai prasidėjusiai redakcijai
+        while i >= 0:
+            if editions[i].contains(date_int):
+                return editions[i]
+            i -= 1
+        return None
+
+    @staticmethod
+    def _day_before(date_int: int) -> int:
+        day = datetime.strptime(str(date_int), "%Y%m%d") - timedelta(days=1)
+        return int(day.strftime("%Y%m%d"))
@@ -0,0 +1,97 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import tiktoken
+from openai import RateLimitError
+
+from CachedEmbeddings import CachedEmbeddings
+
+
+class EmbeddingPipeline:
+    """
+    Atskiras embedding'ų etapas duomenų importui.
+
+    - Tekstai skaidomi į paketus pagal tokenų skaičių (max_batch_tokens) ir dydį (max_batch_size).
+    - Vienu metu siunčiama ne daugiau nei max_workers užklausų.
+    - Tokenų per minutę biudžeto laikosi CachedEmbeddings bendras rate_limiter (jei nurodytas).
+    - Gavus 429 (RateLimitError), bandoma iš naujo po Retry-After arba su eksponentiniu laukimu.
+    - Kiekvienas pavykęs paketas iškart įrašomas į CachedEmbeddings, todėl nutrūkęs
+      importas pratęsiamas nuo ten, kur sustojo – embed'inami tik trūkstami tekstai.
+    """
+
+    def __init__(
+        self,
+        embeddings: CachedEmbeddings,
+        max_batch_tokens: int = 100_000,
+        max_batch_size: int = 512,
+        max_workers: int = 4,
+        max_retries: int = 6,
+        encoding_name: str = "cl100k_base",
+    ):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def run(self, texts: List[str]) -> int:
+        """Užtikrina, kad visų tekstų embedding'ai būtų cache'e. Grąžina naujai embed'intų tekstų skaičių."""
+        missing = self.embeddings.missing(texts)
+        if not missing:
+            return 0
+
+        batches = self._make_batches(missing)
+        print(f"Embedding {len(missing)} new texts in {len(batches)} batches...")
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for count in executor.map(self._embed_batch, batches):
+                done += count
+                print(f" - Embedded {done}/{len(missing)} texts.")
+        return done
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _make_batches(self, texts: List[str]) -> List[List[str]]:
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = len(self._encoding.encode(text, disallowed_special=()))
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> int:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.embeddings.embed_documents(texts)
+                return len(texts)
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                print(f"Rate limited by embedding API, retrying in {delay:.1f}s...")
+                time.sleep(delay)
+        return 0
+
+    @staticmethod
+    def _retry_delay(error: RateLimitError, attempt: int) -> float:
+        # Jei API nurodė Retry-After, laukiam tiek; kitaip – eksponentinis laukimas su atsitiktiniu priedu
+        headers = error.response.headers if error.response is not None else {}
+        for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            try:
+                return min(60.0, max(float(headers[header]) * scale, 0.0))
+            except (KeyError, ValueError):
+                continue
+        return min(60.0, 2 ** attempt) + random.uniform(0, 1)
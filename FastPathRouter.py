@@ -0,0 +1,148 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date as date_cls
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from ArticleIndex import ArticleIndex
+from Store import Store
+
+
+@dataclass
+class FastPathMatch:
+    """Taisyklėmis atpažinta paprasta užklausa ir jau gauti Store duomenys."""
+
+    route: str  # "editions" arba "article"
+    date: Optional[str] = None
+    article_no: Optional[str] = None
+    document: Optional[Document] = None
+    ranges: List[dict] = field(default_factory=list)
+
+
+class FastPathRouter:
+    """
+    Išankstinis maršrutizatorius paprastoms užklausoms, aplenkiantis agento ciklą.
+
+    - "editions": klausimas apie galimas redakcijas – atsakoma tiesiai iš Store, be LLM.
+    - "article": vienas straipsnio numeris ir (nebūtinai) viena data ar metai – straipsnis
+      paimamas iš Store, o atsakymą suformuoja vienas trumpas LLM kvietimas.
+    Sudėtingesni klausimai (palyginimai, keli straipsniai ar datos, pakeitimai) perduodami agentui.
+    Skaičiuoja pataikymų dažnį ir sutaupytą laiką, lyginant su vidutine agento užklausos trukme.
+    """
+
+    MAX_LENGTH = 200
+
+    _EDITIONS_PATTERN = re.compile(r"redakcij", re.IGNORECASE)
+    _LISTING_PATTERN = re.compile(r"\b(kokios|kokių|kurios|kiek|visos|visas|sąraš\w*|turim\w*|yra|galim\w*|prieinam\w*)\b", re.IGNORECASE)
+    _ARTICLE_PATTERN = re.compile(r"\b(\d+(?:[.-]\d+|\(\d+\))*)\s*(?:-?[a-ząčęėįšųūž]{1,6}\s+)?straipsn", re.IGNORECASE)
+    _ISO_DATE_PATTERN = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+    _YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})(?!-\d)")
+    _NUMBER_PATTERN = re.compile(r"\d+(?:[.,:/-]\d+)*")
+    _COMPLEX_PATTERN = re.compile(
+        r"palygin|lygin|skirt|skiriasi|pasikeit|pakeit|keitės|kodėl|apskaič|ar galima|"
+        r"\bnuo\b.*\biki\b|\bir\b.*\bstraipsn|ankstesn|kit\w* redakcij",
+        re.IGNORECASE,
+    )
+
+    def __init__(self, store: Store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hits: Dict[str, int] = {}
+        self._fast_path_time = 0.0
+        self._agent_requests = 0
+        self._agent_time = 0.0
+
+    def route(self, text: str, today: str) -> Optional[FastPathMatch]:
+        text = text.strip()
+        if not text or len(text) > self.MAX_LENGTH or self._COMPLEX_PATTERN.search(text):
+            return None
+
+        articles = {m.group(1) for m in self._ARTICLE_PATTERN.finditer(text)}
+        if not articles and self._EDITIONS_PATTERN.search(text) and self._LISTING_PATTERN.search(text):
+            if self._ISO_DATE_PATTERN.search(text) or self._YEAR_PATTERN.search(text):
+                return None
+            ranges = self.store.resolve_ranges_of_available_editions()
+            return FastPathMatch(route="editions", ranges=ranges) if ranges else None
+
+        if len(articles) != 1:
+            return None
+        date = self.resolve_date(text, today)
+        if date is None:
+            return None
+        article_no = next(iter(articles))
+        document = self.store.resolve_full_document_by_article_no(article_no, date)
+        if document is None:
+            return None
+        return FastPathMatch(route="article", date=date, article_no=article_no, document=document)
+
+    def record_fast_path(self, route: str, elapsed: float) -> None:
+        with self._lock:
+            self._requests += 1
+            self._hits[route] = self._hits.get(route, 0) + 1
+            self._fast_path_time += elapsed
+
+    def record_agent(self, elapsed: float) -> None:
+        with self._lock:
+            self._requests += 1
+            self._agent_requests += 1
+            self._agent_time += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self._hits.values())
+            avg_fast = self._fast_path_time / hits if hits else 0.0
+            avg_agent = self._agent_time / self._agent_requests if self._agent_requests else 0.0
+            return {
+                "requests": self._requests,
+                "hits": hits,
+                "hit_rate": hits / self._requests if self._requests else 0.0,
+                "hits_by_route": dict(self._hits),
+                "avg_fast_path_time": avg_fast,
+                "avg_agent_time": avg_agent,
+                "estimated_time_saved": max(avg_agent - avg_fast, 0.0) * hits if self._agent_requests else None,
+            }
+
+    def numeric_key(self, text: str) -> str:
+        """
+        Klausimo skaičių raktas: normalizuoti straipsnių numeriai ir visi kiti skaičiai (datos, dalys, sumos).
+        Klausimai, kurie skiriasi tik skaičiais, turi skirtingus raktus.
+        """
+        articles = set()
+        article_spans = []
+        for m in self._ARTICLE_PATTERN.finditer(text):
+            articles.add(ArticleIndex.normalize_article_no(m.group(1)))
+            article_spans.append(m.span(1))
+        numbers = {
+            m.group(0)
+            for m in self._NUMBER_PATTERN.finditer(text)
+            if not any(start <= m.start() < end for start, end in article_spans)
+        }
+        return ",".join(sorted(articles)) + "|" + ",".join(sorted(numbers))
+
+    def resolve_date(self, text: str, today: str) -> Optional[str]:
+        """Klausimo data: viena ISO data, vieneri metai su viena redakcija arba šiandiena; kitaip None."""
+        dates = {m.group(0) for m in self._ISO_DATE_PATTERN.finditer(text)}
+        years = {m.group(1) for m in self._YEAR_PATTERN.finditer(text)}
+        if len(dates) > 1 or len(years) > 1 or (dates and years - {d[:4] for d in dates}):
+            return None
+        if dates:
+            date = next(iter(dates))
+            try:
+                date_cls.fromisoformat(date)
+            except ValueError:
+                return None
+            return date
+        if not years:
+            return today
+        year = next(iter(years))
+        if year == today[:4]:
+            return today
+        # Metai be datos tinka tik tada, kai visus metus galiojo ta pati redakcija
+        first = self.store.resolve_editions(f"{year}-01-01")
+        last = self.store.resolve_editions(f"{year}-12-31")
+        if not first or first != last:
+            return None
+        return f"{year}-12-31"
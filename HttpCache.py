@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class HttpCache:
+    """
+    Diske saugomas HTTP atsakymų cache'as (raktas – normalizuotas URL).
+
+    - Atsakymo tekstas saugomas atskirame faile, o indeksas (ETag, Last-Modified,
+      dydis, paskutinio naudojimo laikas) – SQLite lentelėje.
+    - Kiekvienas įrašas prieš naudojimą patikrinamas sąlygine užklausa
+      (If-None-Match / If-Modified-Since), todėl pasikeitęs puslapis visada atsisiunčiamas iš naujo.
+      Nurodžius fresh_for > 0, tiek sekundžių įrašas grąžinamas be jokios užklausos.
+    - Viršijus max_bytes, šalinami seniausiai naudoti įrašai (LRU).
+    """
+
+    def __init__(
+        self,
+        directory: str = "./http_cache",
+        max_bytes: int = 500 * 1024 * 1024,
+        fresh_for: float = 0,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " url TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        key = self._key(url)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        etag, last_modified, stored_at = row
+        return CachedResponse(url, text, etag, last_modified, stored_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return self.fresh_for > 0 and time.time() - entry.stored_at < self.fresh_for
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        key = self._key(url)
+        data = text.encode("utf-8")
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, url, etag, last_modified, size, stored_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, len(data), now, now),
+            )
+            self._evict(conn)
+
+    def mark_revalidated(self, url: str) -> None:
+        """Serveris atsakė 304 – įrašas vėl laikomas šviežiu."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?",
+                (now, now, self._key(url)),
+            )
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(os.path.join(self.directory, "index.sqlite3"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".html")
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from HttpCache import HttpCache
+
+
+def normalize_law_url(url: str) -> str:
+    """e-tar portalo nuorodas su documentId perrašo į tiesioginį dokumento turinio URL."""
+    match = re.search(r'documentId=([a-fA-F0-9]+)', url)
+    if match:
+        return f"https://www.e-tar.lt/rs/legalact/{match.group(1)}/"
+    return url
+
+
+class HttpFetcher:
+    """
+    Bendras HTTP klientas e-seimas / e-tar puslapiams atsisiųsti.
+
+    - Visi užklausimai eina per vieną requests.Session su keep-alive jungčių telkiniu.
+    - fetch_many atsisiunčia kelis URL lygiagrečiai (max_workers) ir grąžina
+      rezultatus tokia tvarka, kokia jie atkeliauja.
+    - Mandagumas serveriui: vienu metu į tą patį host'ą ne daugiau nei
+      max_per_host užklausų ir ne dažniau nei kas min_host_interval sekundžių.
+    - Jei perduotas cache, švieži atsakymai skaitomi iš disko, o pasenę
+      patikrinami sąlygine užklausa (ETag / Last-Modified).
+    """
+
+    DEFAULT_HEADERS = {
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36"
+        ),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Referer": "https://e-seimas.lrs.lt/",
+        "Connection": "keep-alive",
+    }
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_per_host: int = 2,
+        min_host_interval: float = 0.5,
+        timeout: float = 30,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.min_host_interval = min_host_interval
+        self.timeout = timeout
+        self.cache = cache
+
+        self._session = requests.Session()
+        self._session.headers.update(self.DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._hosts_lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_last_request: Dict[str, float] = {}
+
+    def fetch(self, url: str) -> str:
+        """Atsisiunčia vieną URL ir grąžina dekoduotą tekstą."""
+        url = normalize_law_url(url)
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and self.cache.is_fresh(cached):
+            return cached.text
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        host = urlsplit(url).netloc
+        with self._host_slot(host):
+            self._wait_for_host(host)
+            resp = self._session.get(url, timeout=self.timeout, headers=headers)
+
+        if resp.status_code == 304 and cached is not None:
+            self.cache.mark_revalidated(url)
+            return cached.text
+
+        resp.raise_for_status()
+        resp.encoding = resp.apparent_encoding or "utf-8"
+        text = resp.text
+        if self.cache is not None:
+            self.cache.put(url, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return text
+
+    def fetch_many(self, urls: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """
+        Atsisiunčia URL sąrašą lygiagrečiai.
+        Grąžina (url, tekstas) poras iškart, kai tik kuris nors atsisiuntimas baigiasi,
+        kad kvietėjas galėtų pradėti apdorojimą nelaukdamas likusių.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            futures = {executor.submit(self.fetch, url): url for url in urls}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def _wait_for_host(self, host: str) -> None:
+        # Rezervuojam sekantį laisvą laiko tarpą šiam host'ui ir palaukiam iki jo
+        with self._hosts_lock:
+            now = time.monotonic()
+            next_allowed = self._host_last_request.get(host, 0.0) + self.min_host_interval
+            start_at = max(now, next_allowed)
+            self._host_last_request[host] = start_at
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_shared_fetcher: Optional[HttpFetcher] = None
+_shared_fetcher_lock = threading.Lock()
+
+
+def get_shared_fetcher() -> HttpFetcher:
+    """Grąžina procesui bendrą HttpFetcher egzempliorių (vienas jungčių telkinys)."""
+    global _shared_fetcher
+    with _shared_fetcher_lock:
+        if _shared_fetcher is None:
+            _shared_fetcher = HttpFetcher(cache=HttpCache())
+        return _shared_fetcher
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Any, Callable, Hashable, Tuple
+
+from cachetools import TTLCache
+
+
+class QueryCache:
+    """
+    Atmintyje laikomas cache'as su LRU ir TTL išmetimu (cachetools.TTLCache).
+
+    Saugus naudoti iš kelių gijų. Skaičiuoja pataikymus ir praleidimus, o sutaupytą
+    laiką vertina kaip pataikymų skaičių × vidutinę praleidimo (skaičiavimo) trukmę.
+    Skaičiavimo, prasidėjusio prieš clear(), rezultatas į cache'ą nebeįrašomas.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._lock = threading.Lock()
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._miss_time = 0.0
+        # Didinamas kiekvieno clear() metu
+        self._generation = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Grąžina (reikšmė, ar paimta iš cache'o). Skaičiavimas vyksta be užrakto."""
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                pass
+            else:
+                self.hits += 1
+                return value, True
+            generation = self._generation
+
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if generation == self._generation:
+                self._cache[key] = value
+            self.misses += 1
+            self._miss_time += elapsed
+        return value, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss = self._miss_time / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "saved_time": self.hits * avg_miss,
+                "size": len(self._cache),
+            }
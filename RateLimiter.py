@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+
+class RateLimiterBusy(Exception):
+    """Eilė pilna – užklausa atmetama iš karto, kad naudotojas nelauktų be galo."""
+
+
+class RateLimiter:
+    """
+    Procesui bendras OpenAI užklausų ribotuvas (token bucket).
+
+    - Du kibirai: užklausos per minutę ir tokenai per minutę; pildomi tolygiai.
+    - Laukiančios užklausos eilėse pagal sesiją, aptarnaujamos ratu (round-robin),
+      todėl viena sesija su daug kvietimų neužblokuoja kitų.
+    - Tokenai rezervuojami pagal įvertinimą, o po atsakymo pataisomi pagal faktą (adjust).
+    - Viršijus max_queue, acquire iškart meta RateLimiterBusy; status() grąžina eilės
+      ilgį ir apytikslį laukimą, kuriuos gali rodyti UI.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_queue: int = 200):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        # sesija -> jos laukiančių užklausų eilė; _turns – sesijų aptarnavimo eiliškumas
+        self._queues: Dict[str, Deque[object]] = {}
+        self._turns: Deque[str] = deque()
+        self._queued = 0
+        self.total_wait = 0.0
+        self.total_acquired = 0
+
+    def acquire(self, tokens: int, session: Optional[str] = None) -> float:
+        """Laukia savo eilės ir biudžeto. Grąžina laukimo laiką sekundėmis."""
+        session = session if session is not None else _session.get()
+        tokens = min(max(int(tokens), 0), self.tokens_per_minute)
+        ticket = object()
+        start = time.monotonic()
+        with self._cond:
+            if self._queued >= self.max_queue:
+                raise RateLimiterBusy(f"Rate limiter queue is full ({self._queued} waiting).")
+            queue = self._queues.get(session)
+            if queue is None:
+                queue = self._queues[session] = deque()
+                self._turns.append(session)
+            queue.append(ticket)
+            self._queued += 1
+            try:
+                while True:
+                    self._refill()
+                    if self._turns[0] == session and queue[0] is ticket:
+                        wait = self._time_until_available(tokens)
+                        if wait <= 0:
+                            self._requests -= 1
+                            self._tokens -= tokens
+                            break
+                    else:
+                        wait = None
+                    self._cond.wait(wait)
+            finally:
+                queue.remove(ticket)
+                self._queued -= 1
+                self._rotate(session)
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self.total_wait += waited
+            self.total_acquired += 1
+        waits = _waits.get()
+        if waits is not None:
+            waits.append({"tokens": tokens, "wait": waited})
+        return waited
+
+    def adjust(self, tokens_delta: int) -> None:
+        """Pataiso rezervaciją, kai žinomas faktinis tokenų kiekis (teigiamas – sunaudota daugiau)."""
+        with self._cond:
+            self._refill()
+            self._tokens -= tokens_delta
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            self._refill()
+            return {
+                "queued": self._queued,
+                "queued_sessions": len(self._queues),
+                "requests_available": int(self._requests),
+                "tokens_available": int(self._tokens),
+                "estimated_wait": self._time_until_available(0) if self._queued else 0.0,
+                "avg_wait": self.total_wait / self.total_acquired if self.total_acquired else 0.0,
+            }
+
+    # --- vidinės pagalbinės funkcijos ---
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(float(self.requests_per_minute), self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _time_until_available(self, tokens: int) -> float:
+        missing_requests = max(1 - self._requests, 0.0)
+        missing_tokens = max(tokens - self._tokens, 0.0)
+        return max(
+            missing_requests * 60 / self.requests_per_minute,
+            missing_tokens * 60 / self.tokens_per_minute,
+        )
+
+    def _rotate(self, session: str) -> None:
+        # Aptarnauta (ar pasitraukusi) sesija keliauja į eilės galą arba išmetama, jei nebeturi užklausų
+        if self._queues.get(session):
+            if self._turns and self._turns[0] == session:
+                self._turns.rotate(-1)
+            return
+        self._queues.pop(session, None)
+        try:
+            self._turns.remove(session)
+        except ValueError:
+            pass
+
+
+# Sesija, kuriai priskiriami dabartinio konteksto kvietimai, ir jų laukimo eilėje laikai
+_session: ContextVar[str] = ContextVar("rate_limit_session", default="")
+_waits: ContextVar[Optional[List[dict]]] = ContextVar("rate_limit_waits", default=None)
+
+
+def begin_session_request(session: str) -> List[dict]:
+    """Priskiria dabartinio konteksto ribotuvo kvietimus sesijai; grąžina sąrašą, į kurį rašomi jų laukimo laikai."""
+    waits: List[dict] = []
+    _session.set(session)
+    _waits.set(waits)
+    return waits
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(name: str, requests_per_minute: int, tokens_per_minute: int) -> RateLimiter:
+    """Grąžina procesui bendrą ribotuvą pagal pavadinimą (biudžetas nustatomas pirmo kvietimo metu)."""
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _shared_limiters[name] = limiter
+        return limiter
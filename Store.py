@@ -1,113 +1,263 @@
+import hashlib
+import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from typing import Callable, List, Dict, Any, Optional
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from chromadb.types import Metadata
 
+from ArticleDiff import ArticleDiff, EditionDiffCache
+from ArticleIndex import ArticleIndex
+from CachedEmbeddings import CachedEmbeddings
+from ChangeLog import ChangeLog
+from DocumentSnapshotStore import DocumentSnapshotStore
+from EditionIndex import Edition, EditionIndex
+from EmbeddingPipeline import EmbeddingPipeline
 from ESeimasHtmlLoader import ESeimasHtmlLoader
+from QueryCache import QueryCache
+from HttpFetcher import HttpFetcher, get_shared_fetcher
+from RateLimiter import get_shared_rate_limiter
+from SingleFlight import SingleFlight
 import re
-from datetime import datetime, timedelta
-from collections import Counter
+import time
+
+_shared_stores: Dict[str, "Store"] = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_shared_store(db_name: str) -> "Store":
+    """Returns the process-wide Store for db_name (one embeddings client, Chroma client and index set)."""
+    with _shared_stores_lock:
+        store = _shared_stores.get(db_name)
+        if store is None:
+            store = Store(db_name)
+            _shared_stores[db_name] = store
+        return store
+
 
 class Store:
-    def __init__(self, db_name: str):
+    # Chroma rejects very large single writes; upserts and deletes are sent in slices of this size
+    _WRITE_BATCH = 1000
+    # Process-wide OpenAI embeddings budget, shared by query embeddings and ingest
+    EMBEDDING_REQUESTS_PER_MINUTE = 3_000
+    EMBEDDING_TOKENS_PER_MINUTE = 1_000_000
+    # (query, editions, k) -> resolved documents; cleared by prefill
+    QUERY_CACHE_SIZE = 1024
+    QUERY_CACHE_TTL = 60 * 60
+    # Candidates fetched by similarity search and full documents returned by query()
+    QUERY_CANDIDATES = 10
+    QUERY_TOP_K = 3
+
+    def __init__(self, db_name: str, fetcher: Optional[HttpFetcher] = None, parser_backend: str = "soup"):
         self.db_name = db_name
         self.persist_directory = f"./{db_name}"
         self.embeddings = self._get_embedding_model()
+        # Batched, rate-limited embedding stage used by prefill before writing to Chroma
+        self.embedding_pipeline = EmbeddingPipeline(self.embeddings)
+        # Shared keep-alive HTTP pool; concurrency and per-host limits are configured on the fetcher
+        self.fetcher = fetcher or get_shared_fetcher()
+        # "soup" or "stream" (lxml iterparse, lower memory for large acts), see ESeimasHtmlLoader
+        self.parser_backend = parser_backend
+        # Parsed editions keyed by URL and HTML hash; unchanged editions skip parsing on prefill
+        self.snapshots = DocumentSnapshotStore()
 
         self._vector_store: Optional[Chroma] = None
+        # Tool calls of one agent step may run in parallel; the Chroma client must be created once
+        self._vector_store_lock = threading.Lock()
+        # Date -> edition lookup; built on first use and replaced after every prefill
+        self._edition_index: Optional[EditionIndex] = None
+        self._edition_index_lock = threading.Lock()
+        # (edition, article no) -> merged article text, persisted next to the vector store
+        self.article_index = ArticleIndex(self.persist_directory)
+        # Amendments per edition, parsed once at ingest
+        self.change_log = ChangeLog(self.persist_directory)
+        # Adjacent-edition diffs, precomputed at ingest
+        self.edition_diffs = EditionDiffCache(self.persist_directory)
+        # Called with the prefilled URLs once prefill has replaced the indexes (cache invalidation)
+        self._prefill_listeners: List[Callable[[List[str]], None]] = []
+        self._prefill_lock = threading.Lock()
+        # Coalesces identical concurrent searches of all sessions sharing this store
+        self._single_flight = SingleFlight()
+        self.query_cache = QueryCache(self.QUERY_CACHE_SIZE, self.QUERY_CACHE_TTL)
+
+    def add_prefill_listener(self, listener: Callable[[List[str]], None]) -> None:
+        self._prefill_listeners.append(listener)
 
     def _get_vector_store(self) -> Optional[Chroma]:
         if self._vector_store is not None:
             return self._vector_store
-        if not os.path.exists(self.persist_directory):
-            return None
-        self._vector_store = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embeddings,
+        with self._vector_store_lock:
+            if self._vector_store is not None:
+                return self._vector_store
+            if not os.path.exists(self.persist_directory):
+                return None
+            self._vector_store = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings,
+            )
+            return self._vector_store
+
+    def _get_edition_index(self) -> Optional[EditionIndex]:
+        index = self._edition_index
+        if index is not None:
+            return index
+        with self._edition_index_lock:
+            if self._edition_index is None:
+                vector_store = self._get_vector_store()
+                if vector_store is None:
+                    return None
+                self._edition_index = EditionIndex.from_vector_store(vector_store)
+            return self._edition_index
+
+    def _get_embedding_model(self) -> CachedEmbeddings:
+        # Identical chunks across editions are embedded once; see CachedEmbeddings
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+        rate_limiter = get_shared_rate_limiter(
+            "openai-embeddings", self.EMBEDDING_REQUESTS_PER_MINUTE, self.EMBEDDING_TOKENS_PER_MINUTE
         )
-        return self._vector_store
-
-    def _get_embedding_model(self) -> OpenAIEmbeddings:
-        return OpenAIEmbeddings(model="text-embedding-3-large")
-
-    def prefill(self, urls: List[str]) -> None:
-        chunks = self._retrieve_chunks(urls)
-        with open("result.txt", "w", encoding="utf-8") as f:
-            for doc in chunks:
-                f.write(doc.page_content)
-                f.write("\n" + "-"*28 + "\n")
-                for key, value in doc.metadata.items():
-                    f.write(f"{key}: {value}\n")
-                f.write("\n" + "-"*28 + "\n")
-
-        def build_id_from_doc(doc: Document) -> str:
-            m = doc.metadata
-            return f'{m["reference"]}-{m["chunk_number"]}'
-
-        ids = [build_id_from_doc(d) for d in chunks]
-
-        vectordb = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            ids=ids,
+        return CachedEmbeddings(
+            embeddings, model=embeddings.model, dimensions=embeddings.dimensions, rate_limiter=rate_limiter
+        )
+
+    def prefill(self, urls: List[str], incremental: bool = True) -> Dict[str, int]:
+        """
+        Loads the editions and writes their chunks to the vector store.
+        Chunks are matched to stored ones by their reference/chunk_number id and content hash:
+        with incremental=True only new or changed chunks are embedded and upserted,
+        with incremental=False every chunk of these URLs is rewritten.
+        Stored chunks of these URLs that no longer exist are deleted; other URLs are not touched.
+        Returns a delta report with added/updated/unchanged/deleted counts.
+        Concurrent prefills of a shared store run one at a time; readers keep using the
+        previous indexes until each one is swapped in.
+        """
+        with self._prefill_lock:
+            return self._prefill(urls, incremental)
+
+    def _prefill(self, urls: List[str], incremental: bool) -> Dict[str, int]:
+        docs_by_url = self._retrieve_documents(urls)
+        chunks = self._split_documents(docs_by_url)
+
+        chunks_by_id: Dict[str, Document] = {}
+        for chunk in chunks:
+            chunk.metadata["content_hash"] = self._content_hash(chunk)
+            chunks_by_id[self._build_chunk_id(chunk)] = chunk
+
+        vectordb = Chroma(
             persist_directory=self.persist_directory,
+            embedding_function=self.embeddings,
         )
+        stored = vectordb.get(where={"url": {"$in": list(dict.fromkeys(urls))}}, include=["metadatas"])
+        stored_hashes = {
+            id: (meta or {}).get("content_hash")
+            for id, meta in zip(stored["ids"], stored["metadatas"])
+        }
+
+        report = {"added": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        upsert_ids = []
+        for id, chunk in chunks_by_id.items():
+            if id not in stored_hashes:
+                report["added"] += 1
+            elif incremental and stored_hashes[id] == chunk.metadata["content_hash"]:
+                report["unchanged"] += 1
+                continue
+            else:
+                report["updated"] += 1
+            upsert_ids.append(id)
+        stale_ids = [id for id in stored_hashes if id not in chunks_by_id]
+        report["deleted"] = len(stale_ids)
+
+        # Embed everything up front; the Chroma writes below then only read the embedding cache
+        embedded = self.embedding_pipeline.run([chunks_by_id[id].page_content for id in upsert_ids])
+        for i in range(0, len(upsert_ids), self._WRITE_BATCH):
+            batch_ids = upsert_ids[i:i + self._WRITE_BATCH]
+            vectordb.add_documents([chunks_by_id[id] for id in batch_ids], ids=batch_ids)
+        for i in range(0, len(stale_ids), self._WRITE_BATCH):
+            vectordb.delete(ids=stale_ids[i:i + self._WRITE_BATCH])
         self._vector_store = vectordb
+        with self._edition_index_lock:
+            self._edition_index = EditionIndex.from_vector_store(vectordb)
+        self.article_index.replace_editions(self._merge_articles(chunks_by_id.values(), urls))
+        self.change_log.replace_editions(docs_by_url)
+        self.edition_diffs.replace_for_editions(urls, self._diff_adjacent_editions(urls))
 
-        # Count duplicates in the database
-        # Count duplicates by 'id' field in metadata
-        all_metadatas = vectordb.get()['metadatas']
-        print(f"Total chunks in database: {len(all_metadatas)}")
-        ref_chunk_list = [
-            (meta.get('reference'), meta.get('chunk_number'))
-            for meta in all_metadatas
-            if meta.get('reference') is not None and meta.get('chunk_number') is not None
-        ]
-        ref_chunk_counts = Counter(ref_chunk_list)
-        duplicates = {key: count for key, count in ref_chunk_counts.items() if count > 1}
-        print(f"Found {len(duplicates)} duplicate (reference, chunk_number) pairs in the database.")
-        print(f"Prefilled RAG database '{self.db_name}' with {len(chunks)} chunks.")
+        print(f"Prefilled RAG database '{self.db_name}' with {len(chunks_by_id)} chunks: {report}.")
+        # The Chroma writes re-read the cache, so count hits/misses from the pipeline instead
+        print(f"Embedding cache: {len(upsert_ids) - embedded} hits, {embedded} misses.")
+        # Cached search results (and, to keep one lifecycle, query vectors) may point at replaced chunks
+        self.query_cache.clear()
+        self.embeddings.query_cache.clear()
+        for listener in self._prefill_listeners:
+            listener(urls)
+        return report
 
-    def query(self, query: str, date: str) -> List[Document]:
-        date_int = int(date.replace("-", ""))
-        filter = {
-            "$and": [
-                {"effective_from": {"$lte": date_int}},
-                {"effective_to": {"$gte": date_int}},
-                {"title": {"$ne": "Pakeitimai:"}}
-            ]
-        }
+    def resolve_editions(self, date: str) -> List[Edition]:
+        """Editions valid at the date, one per act stored in this database."""
+        index = self._get_edition_index()
+        if index is None:
+            return []
+        return index.resolve_all(int(date.replace("-", "")))
+
+    def query(self, query: str, date: str, timings: Optional[Dict[str, float]] = None) -> List[Document]:
         vector_store = self._get_vector_store()
+        editions = self.resolve_editions(date)
 
-        if vector_store is None:
+        if vector_store is None or not editions:
             return []    
 
-        result = vector_store.similarity_search_with_relevance_scores(query, k=10, filter=filter)
-        top_ids = self._resolve_top_k_doc_ids(result, k=3)
-        top_docs =[]
-        for id in top_ids:
-            full_doc = self._resolve_full_document_by_reference(vector_store, id, date_int)
-            if full_doc is not None:
-                print(f"Resolved full document for reference {full_doc.metadata.get('title')}.")
-                top_docs.append(full_doc)
-        return top_docs
+        # Repeated searches in the same editions come from the cache; identical concurrent
+        # misses share one Chroma/embedding round trip
+        step_start = time.perf_counter()
+        urls = tuple(sorted(edition.url for edition in editions))
+        key = (" ".join(query.split()), urls, self.QUERY_CANDIDATES, self.QUERY_TOP_K)
+        flight = {}
+
+        def search():
+            result, flight["shared"] = self._single_flight.do(key, lambda: self._query_edition(vector_store, query, list(urls)))
+            return result
+
+        (top_docs, steps), hit = self.query_cache.get_or_compute(key, search)
+        if timings is not None:
+            if hit:
+                timings["cache_lookup"] = time.perf_counter() - step_start
+            elif flight.get("shared"):
+                timings["single_flight_wait"] = time.perf_counter() - step_start
+            else:
+                timings.update(steps)
+        return list(top_docs)
+
+    def query_cache_stats(self) -> Dict[str, dict]:
+        return {"retrieval": self.query_cache.stats(), "embedding": self.embeddings.query_cache.stats()}
 
     def resolve_full_document_by_article_no(self, no: str, date: str) -> Optional[Document]:
-        date_int = int(date.replace("-", ""))
-        no = re.sub(r'^(\d+\.\d+)\((\d+)\)$', r'\1-\2', no)
         vector_store = self._get_vector_store()
+        editions = self.resolve_editions(date)
 
-        if vector_store is None:
+        if vector_store is None or not editions:
             return None
 
+        # With several acts in the database the first edition that has the article wins
+        for edition in editions:
+            doc = self._resolve_article_in_edition(vector_store, no, edition)
+            if doc is not None:
+                return doc
+        return None
+
+    def _resolve_article_in_edition(self, vector_store: Chroma, no: str, edition: Edition) -> Optional[Document]:
+        if self.article_index.has_edition(edition.url):
+            doc = self.article_index.get(edition.url, no)
+            print(f"Resolved article no: {no} from article index, found: {doc is not None}.")
+            return doc
+
+        # Stores prefilled before the article index existed
+        no = re.sub(r'^(\d+\.\d+)\((\d+)\)$', r'\1-\2', no)
+
         where = {
             "$and": [
                 {"article_no": no},
-                {"effective_from": {"$lte": date_int}},            
-                {"effective_to": {"$gte": date_int}}
+                {"url": edition.url}
             ]
         }
         result = vector_store.get(where=where)
@@ -116,28 +266,110 @@ class Store:
             return None
         return self._merge_chunks_to_single_document(result)
 
+    def resolve_articles(self, article_nos: List[str], dates: List[str]) -> dict:
+        """
+        Batch variant of resolve_full_document_by_article_no for every (article, date) pair.
+        Dates that fall into the same edition share one lookup, and editions without an
+        article index are read from Chroma in a single query.
+        Returns the resolved editions (with the requested dates), one entry per
+        (edition, article) pair and the dates no edition was found for. An article whose
+        text did not change since the previous listed edition refers to it instead of
+        repeating the text.
+        """
+        article_nos = list(dict.fromkeys(article_nos))
+        result = {"editions": [], "articles": [], "unresolved_dates": []}
+        vector_store = self._get_vector_store()
+        index = self._get_edition_index()
+        if vector_store is None or index is None:
+            result["unresolved_dates"] = list(dict.fromkeys(dates))
+            return result
+
+        editions: Dict[str, Edition] = {}
+        dates_by_url: Dict[str, List[str]] = {}
+        for date in dict.fromkeys(dates):
+            date_editions = index.resolve_all(int(date.replace("-", "")))
+            if not date_editions:
+                result["unresolved_dates"].append(date)
+                continue
+            for edition in date_editions:
+                editions.setdefault(edition.url, edition)
+                dates_by_url.setdefault(edition.url, []).append(date)
+
+        docs: Dict[tuple, Optional[Document]] = {}
+        legacy_urls = []
+        for url in editions:
+            if self.article_index.has_edition(url):
+                for no in article_nos:
+                    docs[(url, no)] = self.article_index.get(url, no)
+            else:
+                legacy_urls.append(url)
+        if legacy_urls:
+            docs.update(self._resolve_articles_from_chunks(vector_store, legacy_urls, article_nos))
+
+        ordered = sorted(editions.values(), key=lambda e: e.effective_from)
+        for edition in ordered:
+            result["editions"].append({**self._describe_edition(edition), "dates": dates_by_url[edition.url]})
+        for no in article_nos:
+            # Previous listed edition with this article, per act
+            previous: Dict[str, tuple] = {}
+            for edition in ordered:
+                doc = docs.get((edition.url, no))
+                entry = {"article_no": no, "edition_url": edition.url, "found": doc is not None}
+                if doc is not None:
+                    entry["title"] = doc.metadata.get("title")
+                    entry["reference"] = doc.metadata.get("reference")
+                    prev = previous.get(edition.act)
+                    if prev is not None and prev[1].page_content == doc.page_content:
+                        entry["same_text_as_edition"] = prev[0]
+                    else:
+                        entry["text"] = doc.page_content
+                    previous[edition.act] = (edition.url, doc)
+                result["articles"].append(entry)
+        return result
+
     def retrieve_list_of_changes(self, date: str) -> List[dict]:
-        date_int = int(date.replace("-", ""))
-        filter = {"title": "Pakeitimai:"}
+        """Changes that came into force with the edition valid at the date, for every act."""
         vector_store = self._get_vector_store()
-        if vector_store is None:
+        index = self._get_edition_index()
+        if vector_store is None or index is None:
+            return []
+
+        changes = []
+        for edition in index.resolve_all(int(date.replace("-", ""))):
+            changes.extend(self._changes_since_previous_edition(vector_store, index, edition))
+        return changes
+
+    def _changes_since_previous_edition(self, vector_store: Chroma, index: EditionIndex, edition: Edition) -> List[dict]:
+        previous_edition = index.previous(edition)
+        if previous_edition is None:
             return []
 
+        if self.change_log.has_edition(edition.url) and self.change_log.has_edition(previous_edition.url):
+            previous_numbers = [change["number"] for change in self.change_log.get_changes(previous_edition.url)]
+            if not previous_numbers:
+                return []
+            last_change = max(previous_numbers)
+            eff_from = str(edition.effective_from)
+            effective_from = f"{eff_from[:4]}-{eff_from[4:6]}-{eff_from[6:]}"
+            return [
+                {**change, "effective_from": effective_from}
+                for change in self.change_log.get_changes(edition.url)
+                if change["number"] > last_change
+            ]
+
+        # Stores prefilled before the change log existed: parse the last change chunks
+        filter = {
+            "$and": [
+                {"title": "Pakeitimai:"},
+                {"url": {"$in": [edition.url, previous_edition.url]}}
+            ]
+        }
         result = vector_store.get(where=filter)
-        current_edition_change_docs = self._get_documents_by_effective_date(date_int, result)
+        current_edition_change_docs = self._get_documents_by_edition(edition, result)
         if not current_edition_change_docs:
             return []
-        eff_from = current_edition_change_docs[0].metadata.get("effective_from", 0)
-        date_of_previous_edition = 0
-        if eff_from:
-            eff_from_str = str(eff_from)
-            eff_from_date = datetime.strptime(eff_from_str, "%Y%m%d")
-            previous_day = eff_from_date - timedelta(days=1)
-            date_of_previous_edition = int(previous_day.strftime("%Y%m%d"))
-        if date_of_previous_edition == 0:
-            return []
         previous_edition_change_docs = self._resolve_latest_change_list(
-            self._get_documents_by_effective_date(date_of_previous_edition, result)
+            self._get_documents_by_edition(previous_edition, result)
         )
         last_change = sorted(
             previous_edition_change_docs, 
@@ -147,28 +379,72 @@ class Store:
             return []
         return [doc for doc in self._resolve_latest_change_list(current_edition_change_docs) if doc["number"] > last_change]
 
-    def resolve_ranges_of_available_editions(self) -> List[dict]:
+    def diff_article(self, no: str, date_from: str, date_to: str) -> List[dict]:
+        """
+        Diffs the article between the editions of each act valid at both dates, using the
+        editions the article is found in. When no act has it, the latest one reports "missing".
+        """
         vector_store = self._get_vector_store()
+        pairs = self._edition_pairs(date_from, date_to)
+        if vector_store is None or not pairs:
+            return []
 
-        if vector_store is None:
+        diffs = []
+        for old_edition, new_edition in pairs:
+            diffs.append({
+                "article_no": no,
+                "from_edition": self._describe_edition(old_edition),
+                "to_edition": self._describe_edition(new_edition),
+                **ArticleDiff.diff_documents(
+                    self._resolve_article_in_edition(vector_store, no, old_edition),
+                    self._resolve_article_in_edition(vector_store, no, new_edition),
+                )
+            })
+        found = [diff for diff in diffs if diff["status"] != "missing"]
+        return found or diffs[:1]
+
+    def diff_editions(self, date_from: str, date_to: str) -> List[dict]:
+        """Diffs the editions valid at both dates, one entry per act that has an edition at both."""
+        diffs = []
+        for old_edition, new_edition in self._edition_pairs(date_from, date_to):
+            diff = self.edition_diffs.get(old_edition.url, new_edition.url)
+            if diff is None:
+                if not (self.article_index.has_edition(old_edition.url) and self.article_index.has_edition(new_edition.url)):
+                    continue
+                diff = ArticleDiff.diff_editions(
+                    self.article_index.get_edition(old_edition.url),
+                    self.article_index.get_edition(new_edition.url),
+                )
+            diffs.append({
+                "from_edition": self._describe_edition(old_edition),
+                "to_edition": self._describe_edition(new_edition),
+                **diff
+            })
+        return diffs
+
+    def _edition_pairs(self, date_from: str, date_to: str) -> List[tuple[Edition, Edition]]:
+        # Editions of the same act valid at both dates; latest-started new edition first
+        index = self._get_edition_index()
+        if index is None:
             return []
-        
-        filter = {
-            "$and": [
-                {"title": {"$eq": "Pakeitimai:"}},
-                {"chunk_number": {"$eq": 1}}
-            ]
-        }
-        result = vector_store.get(where=filter)
-        documents = result['documents']
-        metadatas = result['metadatas']
-        if not documents:
+        date_from_int = int(date_from.replace("-", ""))
+        pairs = []
+        for new_edition in index.resolve_all(int(date_to.replace("-", ""))):
+            old_edition = index.resolve_in_act(new_edition.act, date_from_int)
+            if old_edition is not None:
+                pairs.append((old_edition, new_edition))
+        return pairs
+
+    def resolve_ranges_of_available_editions(self) -> List[dict]:
+        index = self._get_edition_index()
+
+        if index is None:
             return []
-        pairs = zip(documents, metadatas)
+
         ranges = []
-        for _, meta in pairs:
-            eff_from = meta.get("effective_from")
-            eff_to = meta.get("effective_to")
+        for edition in index:
+            eff_from = edition.effective_from
+            eff_to = edition.effective_to
             eff_from_str = str(eff_from)
             eff_to_str = str(eff_to)
             eff_from_fmt = f"{eff_from_str[:4]}-{eff_from_str[4:6]}-{eff_from_str[6:]}" if eff_from_str and len(eff_from_str) == 8 else None
@@ -185,14 +461,30 @@ class Store:
         return ranges
 
     # Private methods
-    def _retrieve_chunks(self, urls: List[str]) -> List[Document]:
-        loader = ESeimasHtmlLoader()
-        docs = []
-        for url in urls:
-            print(f"Loading document from {url}...")
-            loaded_docs = loader.load(url)
-            print(f" - Loaded {len(loaded_docs)} documents.")
-            docs.extend(loaded_docs)
+    @staticmethod
+    def _build_chunk_id(doc: Document) -> str:
+        m = doc.metadata
+        return f'{m["reference"]}-{m["chunk_number"]}'
+
+    @staticmethod
+    def _content_hash(chunk: Document) -> str:
+        # Metadata is part of the hash: an edition gaining its "iki" date only moves effective_to
+        metadata = {k: v for k, v in chunk.metadata.items() if k != "content_hash"}
+        payload = json.dumps([chunk.page_content, metadata], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _retrieve_documents(self, urls: List[str]) -> Dict[str, List[Document]]:
+        loader = ESeimasHtmlLoader(self.fetcher, backend=self.parser_backend, snapshots=self.snapshots)
+        print(f"Loading {len(urls)} documents...")
+        # Editions are parsed as soon as each download completes; keep the input order for chunk ids
+        loaded = {}
+        for url, loaded_docs in loader.load_many(urls):
+            print(f" - Loaded {len(loaded_docs)} documents from {url}.")
+            loaded[url] = loaded_docs
+        return {url: loaded[url] for url in dict.fromkeys(urls)}
+
+    def _split_documents(self, docs_by_url: Dict[str, List[Document]]) -> List[Document]:
+        docs = [doc for loaded_docs in docs_by_url.values() for doc in loaded_docs]
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         all_chunks = []
         for doc in docs:
@@ -209,11 +501,61 @@ class Store:
             all_chunks.extend(chunks)
         return all_chunks
 
+    def _merge_articles(self, chunks, urls: List[str]) -> Dict[str, List[tuple[str, Document]]]:
+        """Groups article chunks per edition and part id and merges them the same way query results are merged."""
+        grouped: Dict[tuple[str, str], Dict[str, List[Any]]] = {}
+        for chunk in chunks:
+            meta = chunk.metadata
+            if not meta.get("article_no"):
+                continue
+            group = grouped.setdefault((meta["url"], meta["id"]), {"documents": [], "metadatas": []})
+            group["documents"].append(chunk.page_content)
+            group["metadatas"].append(meta)
+        articles: Dict[str, List[tuple[str, Document]]] = {url: [] for url in dict.fromkeys(urls)}
+        for (url, _), group in grouped.items():
+            doc = self._merge_chunks_to_single_document(group)
+            if doc is not None:
+                articles.setdefault(url, []).append((group["metadatas"][0]["article_no"], doc))
+        return articles
+
+    def _diff_adjacent_editions(self, urls: List[str]) -> Dict[tuple[str, str], dict]:
+        ingested = set(urls)
+        index = self._get_edition_index()
+        # Only consecutive editions of the same act are neighbours
+        pairs = [
+            pair
+            for editions in (index.by_act().values() if index is not None else [])
+            for pair in zip(editions, editions[1:])
+        ]
+        diffs = {}
+        for old_edition, new_edition in pairs:
+            if old_edition.url not in ingested and new_edition.url not in ingested:
+                continue
+            if not (self.article_index.has_edition(old_edition.url) and self.article_index.has_edition(new_edition.url)):
+                continue
+            diffs[(old_edition.url, new_edition.url)] = ArticleDiff.diff_editions(
+                self.article_index.get_edition(old_edition.url),
+                self.article_index.get_edition(new_edition.url),
+            )
+        print(f"Precomputed {len(diffs)} adjacent edition diffs.")
+        return diffs
+
+    @staticmethod
+    def _describe_edition(edition: Edition) -> dict:
+        eff_from = str(edition.effective_from)
+        eff_to = str(edition.effective_to)
+        return {
+            "url": edition.url,
+            "effective_from": f"{eff_from[:4]}-{eff_from[4:6]}-{eff_from[6:]}",
+            "effective_to": None if edition.effective_to == 30000000 else f"{eff_to[:4]}-{eff_to[4:6]}-{eff_to[6:]}"
+        }
+
     def _resolve_top_k_doc_ids(self, retrieved_docs: List[tuple[Document, float]], k: int = 3) -> List[str]:
         from collections import defaultdict
         grouped = defaultdict(list)
         for doc, score in retrieved_docs:
-            id = doc.metadata.get("id")
+            # Part ids may repeat across acts; the reference (url#id) does not
+            id = doc.metadata.get("reference")
             grouped[id].append((doc, score))
         group_stats = []
         for id, items in grouped.items():
@@ -224,17 +566,62 @@ class Store:
         top_groups = group_stats[:k]
         return [id for id, _, _, _ in top_groups]
 
-    def _resolve_full_document_by_reference(self, vector_store: Chroma, id: str, date_int: int) -> Optional[Document]:
+    def _resolve_full_documents_by_references(self, vector_store: Chroma, ids: List[str]) -> List[Document]:
+        """Fetches the chunks of all given references in one query and merges them per reference, keeping their order."""
+        if not ids:
+            return []
+        result = vector_store.get(where={"reference": {"$in": ids}})
+        print(f"Resolving full documents for references {ids}, found {len(result['documents'])} chunks.")
+        grouped = {id: {"documents": [], "metadatas": []} for id in ids}
+        for content, meta in zip(result['documents'], result['metadatas']):
+            group = grouped.get(meta.get("reference"))
+            if group is not None:
+                group["documents"].append(content)
+                group["metadatas"].append(meta)
+        top_docs = []
+        for id in ids:
+            full_doc = self._merge_chunks_to_single_document(grouped[id])
+            if full_doc is not None:
+                print(f"Resolved full document for reference {full_doc.metadata.get('title')}.")
+                top_docs.append(full_doc)
+        return top_docs
+
+    def _query_edition(self, vector_store: Chroma, query: str, urls: List[str]) -> tuple:
+        timings = {}
+        filter = {
+            "$and": [
+                {"url": {"$in": urls}},
+                {"title": {"$ne": "Pakeitimai:"}}
+            ]
+        }
+
+        step_start = time.perf_counter()
+        result = vector_store.similarity_search_with_relevance_scores(query, k=self.QUERY_CANDIDATES, filter=filter)
+        top_ids = self._resolve_top_k_doc_ids(result, k=self.QUERY_TOP_K)
+        timings["similarity_search"] = time.perf_counter() - step_start
+
+        step_start = time.perf_counter()
+        top_docs = self._resolve_full_documents_by_references(vector_store, top_ids)
+        timings["resolve_full_documents"] = time.perf_counter() - step_start
+        return top_docs, timings
+
+    def _resolve_articles_from_chunks(self, vector_store: Chroma, urls: List[str], nos: List[str]) -> Dict[tuple, Document]:
+        # Stores prefilled before the article index existed: one query for all pairs
+        stored_nos = {re.sub(r'^(\d+\.\d+)\((\d+)\)$', r'\1-\2', no): no for no in nos}
         where = {
             "$and": [
-                {"id": id},
-                {"effective_from": {"$lte": date_int}},            
-                {"effective_to": {"$gte": date_int}}
+                {"article_no": {"$in": list(stored_nos)}},
+                {"url": {"$in": urls}}
             ]
         }
         result = vector_store.get(where=where)
-        print(f"Resolving full document for reference {id}, found {len(result['documents'])} chunks.")
-        return self._merge_chunks_to_single_document(result)
+        grouped: Dict[tuple, Dict[str, List[Any]]] = {}
+        for content, meta in zip(result['documents'], result['metadatas']):
+            key = (meta.get("url"), stored_nos.get(meta.get("article_no")))
+            group = grouped.setdefault(key, {"documents": [], "metadatas": []})
+            group["documents"].append(content)
+            group["metadatas"].append(meta)
+        return {key: self._merge_chunks_to_single_document(group) for key, group in grouped.items()}
 
     def _merge_chunks_to_single_document(self, result: Dict[str, List[Any]]) -> Optional[Document]:
         documents = result['documents']
@@ -259,22 +646,17 @@ class Store:
         ]}
         return Document(page_content=content, metadata=selected_meta)
 
-    def _get_documents_by_effective_date(self, date_int: int, result: Dict[str, List[Any]]) -> Optional[List[Document]]:
+    def _get_documents_by_edition(self, edition: Edition, result: Dict[str, List[Any]]) -> Optional[List[Document]]:
         documents = result['documents']
         metadatas = result['metadatas']
         if not documents:
             return None
         pairs = zip(documents, metadatas)
-        filtered_docs = []
-        for content, meta in pairs:
-            eff_from = meta.get("effective_from")
-            eff_to = meta.get("effective_to")
-            if eff_from and eff_from > date_int:
-                continue
-            if eff_to and eff_to < date_int:
-                continue
-            filtered_docs.append(Document(page_content=content, metadata=meta))
-        return filtered_docs
+        return [
+            Document(page_content=content, metadata=meta)
+            for content, meta in pairs
+            if meta.get("url") == edition.url
+        ]
 
     def _resolve_latest_change_list(self, change_docs: Optional[List[Document]]) -> List[dict]:
         if not change_docs:
@@ -284,23 +666,7 @@ class Store:
             key=lambda doc: doc.metadata.get("chunk_number", 0)
         )
         last_changes = "\n".join(doc.page_content for doc in sorted_docs[-2:])
-        pattern = re.compile(
-            r'(?P<number>\d+)\.\n'
-            r'(?P<text1>.+?)\n'
-            r'Nr\. [^\[]+\[href="(?P<url>[^"]+)"\], [^\n]+\n'
-            r'(?P<text2>.+?)(?=\n\d+\.|\Z)', re.DOTALL
-        )
-        results = []
-        for match in pattern.finditer(last_changes):
-            number = int(match.group('number'))
-            url = match.group('url')
-            text1 = re.sub(r'\[href="[^"]+"\]', '', match.group('text1')).strip()
-            text2 = match.group('text2').strip()
-            text = f"{text1}\n{match.group(0).splitlines()[2]}\n{text2}".strip()
-            text = re.sub(r'\[href="[^"]+"\]', '', text)
-            results.append({
-                "number": number,
-                "url": url,
-                "text": text
-            })
-        return results
+        return [
+            {"number": change["number"], "url": change["url"], "text": change["text"]}
+            for change in ChangeLog.parse_changes(last_changes)
+        ]
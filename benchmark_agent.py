@@ -0,0 +1,63 @@
+"""
+ESeimasAgent kiekvieno pokalbio žingsnio pridėtinių kaštų palyginimas:
+senasis elgesys (init_chat_model + create_agent kiekvienai žinutei) prieš
+vieną kartą sukurtą ir pakartotinai naudojamą agentą.
+
+Naudojimas:
+    python benchmark_agent.py pm_chroma_db
+    python benchmark_agent.py pm_chroma_db --question "Koks pelno mokesčio tarifas?" --turns 3
+
+Išmatuoti rezultatai – benchmark_agent_results.md.
+"""
+import argparse
+import time
+import uuid
+
+from langchain.chat_models import init_chat_model
+
+from ESeimasAgent import CHAT_MODEL, ESeimasAgent
+
+
+def per_turn_build(agent: ESeimasAgent) -> float:
+    start = time.perf_counter()
+    agent._build_agent(init_chat_model(CHAT_MODEL))
+    return time.perf_counter() - start
+
+
+def reused(agent: ESeimasAgent) -> float:
+    start = time.perf_counter()
+    agent._get_agent()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("db_name", help="Chroma bazės katalogas (pvz., pm_chroma_db)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--question", help="Papildomai paleisti tikrus pokalbio žingsnius (kviečia OpenAI API)")
+    parser.add_argument("--turns", type=int, default=3)
+    args = parser.parse_args()
+
+    agent = ESeimasAgent(args.db_name, law_name="Pelno mokesčio įstatymas")
+
+    first = reused(agent)
+    old_times = [per_turn_build(agent) for _ in range(args.repeat)]
+    new_times = [reused(agent) for _ in range(args.repeat)]
+    old_avg = sum(old_times) / len(old_times)
+    new_avg = sum(new_times) / len(new_times)
+    print(f"Pirmas agento sukūrimas:                   {first * 1000:.1f} ms")
+    print(f"init_chat_model + create_agent kiekvienam žingsniui: {old_avg * 1000:.1f} ms vidutiniškai")
+    print(f"Pakartotinai naudojamas agentas:           {new_avg * 1000:.3f} ms vidutiniškai")
+    print(f"Sutaupoma kiekvienam žingsniui:            {(old_avg - new_avg) * 1000:.1f} ms")
+
+    if args.question:
+        parameters = {"thread_id": str(uuid.uuid4())}
+        for turn in range(args.turns):
+            response = agent.get_agent_response({"role": "user", "content": args.question}, parameters)
+            step_timings = response["timings"]["step_timings"]
+            print(f"Žingsnis {turn + 1}: get_agent {step_timings['get_agent'] * 1000:.3f} ms, "
+                  f"agent_invoke {step_timings['agent_invoke']:.2f} s, viso {response['timings']['total_time']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+ESeimasHtmlLoader parsinimo greičio palyginimas su išsaugota įstatymo HTML kopija.
+Lygina senąją rekursinę analizę su vieno praėjimo analize bei "soup" ir "stream"
+parsinimo būdus (laiką, atminties piką ir ar rezultatai sutampa).
+
+Naudojimas:
+    python benchmark_loader.py pm.html
+    python benchmark_loader.py pm.html --download https://e-seimas.lrs.lt/portal/legalAct/lt/TAD/TAIS.157066/AKYcONSsXt
+    python benchmark_loader.py pm.html --from-odt data/PM.odt
+
+Išmatuoti rezultatai – benchmark_loader_results.md.
+"""
+import argparse
+import hashlib
+import html as html_lib
+import os
+import re
+import time
+import tracemalloc
+import zipfile
+from typing import List
+
+from lxml import etree
+
+from ESeimasHtmlLoader import ESeimasHtmlLoader
+
+pmReferalUrl = "https://e-seimas.lrs.lt/portal/legalAct/lt/TAD/TAIS.157066/AKYcONSsXt"
+
+
+class UncachedLoader(ESeimasHtmlLoader):
+    """Senasis elgesys: antraštės ir straipsnių paieška skaičiuojama kaskart iš naujo."""
+
+    def _analyze_parts(self, root):
+        return {}
+
+
+def time_parse(loader: ESeimasHtmlLoader, html: str, repeat: int):
+    best = None
+    docs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        docs = loader.parse(html, pmReferalUrl)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, docs
+
+
+def peak_memory_parse(loader: ESeimasHtmlLoader, html: str) -> float:
+    tracemalloc.start()
+    try:
+        loader.parse(html, pmReferalUrl)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def as_comparable(docs):
+    return [(d.page_content, d.metadata) for d in docs]
+
+
+_ODT_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+_ODT_STYLE = "{urn:oasis:names:tc:opendocument:xmlns:style:1.0}"
+_ODT_TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+_XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+def odt_to_edition_html(odt_path: str) -> str:
+    """
+    Iš e-seimas redakcijos ODT eksporto (pvz. data/PM.odt) atkuria e-seimas HTML struktūrą:
+    div.WordSection1 > div#part... (skyriai, straipsniai, priedėliai), p.MsoNormal su
+    <b>, <i>, <sup> ir nuorodomis. Tušti ODT paragrafai atitinka div#part... ribas,
+    todėl straipsnio blokai po tuščios eilutės tampa įdėtais part'ais.
+    """
+    content = etree.fromstring(zipfile.ZipFile(odt_path).read("content.xml"))
+    styles = {}
+    for style in content.iter(_ODT_STYLE + "style"):
+        props = set()
+        for tp in style.iter(_ODT_STYLE + "text-properties"):
+            if tp.get("{urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0}font-weight") == "bold":
+                props.add("b")
+            if tp.get("{urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0}font-style") == "italic":
+                props.add("i")
+            if (tp.get(_ODT_STYLE + "text-position") or "").startswith("super"):
+                props.add("sup")
+        styles[style.get(_ODT_STYLE + "name")] = props
+
+    def wrap(inner: str, props: set) -> str:
+        for tag in ("sup", "i", "b"):
+            if tag in props and inner.strip():
+                inner = f"<{tag}>{inner}</{tag}>"
+        return inner
+
+    def inline(node) -> str:
+        out = [html_lib.escape(node.text or "", quote=False)]
+        for child in node:
+            if child.tag == _ODT_TEXT + "span":
+                out.append(wrap(inline(child), styles.get(child.get(_ODT_TEXT + "style-name"), set())))
+            elif child.tag == _ODT_TEXT + "a":
+                out.append(f'<a href="{html_lib.escape(child.get(_XLINK_HREF, ""))}">{inline(child)}</a>')
+            elif child.tag in (_ODT_TEXT + "s", _ODT_TEXT + "tab"):
+                out.append(" ")
+            elif child.tag == _ODT_TEXT + "line-break":
+                out.append("<br>")
+            elif isinstance(child.tag, str) and child.tag.startswith(_ODT_TEXT + "bookmark"):
+                pass
+            else:
+                out.append(inline(child))
+            out.append(html_lib.escape(child.tail or "", quote=False))
+        return "".join(out)
+
+    def to_html(node) -> str:
+        if node.tag == _ODT_TABLE + "table":
+            rows = []
+            for row in node.iter(_ODT_TABLE + "table-row"):
+                cells = "".join(
+                    "<td>" + "".join(to_html(p) for p in cell) + "</td>"
+                    for cell in row.iter(_ODT_TABLE + "table-cell")
+                )
+                rows.append(f"<tr>{cells}</tr>")
+            return '<table class="MsoNormalTable">' + "".join(rows) + "</table>"
+        props = styles.get(node.get(_ODT_TEXT + "style-name"), set())
+        return f'<p class="MsoNormal">{wrap(inline(node), props)}</p>'
+
+    body = content.find(".//office:text", {"office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0"})
+    nodes = [n for n in body if n.tag in (_ODT_TEXT + "p", _ODT_TEXT + "h", _ODT_TABLE + "table")]
+
+    def text_of(node) -> str:
+        return "".join(node.itertext()).strip()
+
+    def part(key: str, inner: List[str]) -> str:
+        part_id = "part_" + hashlib.md5(f"{odt_path}:{key}".encode("utf-8")).hexdigest()
+        return f'<div id="{part_id}">\n' + "\n".join(inner) + "\n</div>"
+
+    top: List[str] = []  # įstatymo antraštė
+    chapters: List[str] = []  # skyriai ir priedėliai
+    chapter: List[str] = []
+    article: List[str] = []
+    block: List[str] = []
+    in_article_head = False
+
+    def close_block():
+        nonlocal block
+        if block:
+            if in_article_head or not article:
+                (article if article else chapter).extend(block)
+            else:
+                article.append(part(f"{len(chapters)}-{len(chapter)}-{len(article)}", block))
+        block = []
+
+    def close_article():
+        nonlocal article
+        close_block()
+        if article:
+            chapter.append(part(f"{len(chapters)}-{len(chapter)}", article))
+        article = []
+
+    def close_chapter():
+        nonlocal chapter
+        close_article()
+        if chapter:
+            chapters.append(part(str(len(chapters)), chapter))
+        chapter = []
+
+    seen_chapter = False
+    for node in nodes:
+        text = text_of(node)
+        if node.tag != _ODT_TABLE + "table" and re.match(r"^([IVX]+\d*\s*SKYRIUS|\d+\s*priedėlis$|Pakeitimai:$)", text):
+            if not seen_chapter:
+                seen_chapter = True
+            else:
+                close_chapter()
+            chapter.append(to_html(node))
+            continue
+        if not seen_chapter:
+            if text:
+                top.append(to_html(node))
+            continue
+        if re.match(r"^\d+\s*straipsnis", text):
+            close_article()
+            article.append(to_html(node))
+            in_article_head = True
+            continue
+        if not text and node.tag != _ODT_TABLE + "table":
+            close_block()
+            in_article_head = False
+            continue
+        block.append(to_html(node))
+    close_chapter()
+
+    return (
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8"></head><body>\n'
+        '<div class="WordSection1">\n' + part("top", top + chapters) + "\n</div>\n</body></html>\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("html_path", help="Išsaugotas Pelno mokesčio įstatymo HTML failas")
+    parser.add_argument("--download", metavar="URL", help="Pirmiau atsisiųsti redakciją į html_path")
+    parser.add_argument("--from-odt", metavar="ODT", help="Pirmiau atkurti redakcijos HTML iš ODT eksporto į html_path")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.from_odt:
+        with open(args.html_path, "w", encoding="utf-8") as f:
+            f.write(odt_to_edition_html(args.from_odt))
+    elif args.download:
+        loader = ESeimasHtmlLoader()
+        html = loader._download(loader._to_document_url(args.download))
+        with open(args.html_path, "w", encoding="utf-8") as f:
+            f.write(html)
+
+    with open(args.html_path, "r", encoding="utf-8") as f:
+        html = f.read()
+    print(f"HTML: {args.html_path} ({os.path.getsize(args.html_path) / 1024:.0f} KB)")
+
+    old_time, old_docs = time_parse(UncachedLoader(), html, args.repeat)
+    new_time, new_docs = time_parse(ESeimasHtmlLoader(), html, args.repeat)
+
+    same = as_comparable(old_docs) == as_comparable(new_docs)
+    print(f"Be atminties (rekursinė paieška): {old_time:.3f}s, {len(old_docs)} dokumentų")
+    print(f"Su vieno praėjimo analize:        {new_time:.3f}s, {len(new_docs)} dokumentų")
+    print(f"Pagreitėjimas: {old_time / new_time:.1f}x, rezultatai sutampa: {same}")
+
+    stream_loader = ESeimasHtmlLoader(backend="stream")
+    stream_time, stream_docs = time_parse(stream_loader, html, args.repeat)
+    soup_peak = peak_memory_parse(ESeimasHtmlLoader(), html)
+    stream_peak = peak_memory_parse(stream_loader, html)
+    parity = as_comparable(new_docs) == as_comparable(stream_docs)
+    print(f"soup:   {new_time:.3f}s, atminties pikas {soup_peak:.1f} MB")
+    print(f"stream: {stream_time:.3f}s, atminties pikas {stream_peak:.1f} MB")
+    print(f"soup ir stream rezultatai sutampa: {parity}")
+    if not parity:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # streamlit: title = "Duomenų importavimas"
 import traceback
 import streamlit as st
-from Store import Store
+from Store import get_shared_store
 import logging
 
 logging.basicConfig(
@@ -14,7 +14,8 @@ logging.basicConfig(
     ]
 )
 
-store = Store("pm_chroma_db")
+# Same Store instance as the chat sessions, so they switch to the new indexes right after an import
+store = get_shared_store("pm_chroma_db")
 
 st.set_page_config(page_title="Duomenų importavimas")
 st.title("Žinių bazės atnaujinimas (Admin)")
@@ -36,8 +37,12 @@ if st.button("Atnaujinti žinių bazę"):
     else:
         with st.spinner("Vyksta atnaujinimas..."):
             try:
-                store.prefill(url_list)
-                st.success("Žinių bazė sėkmingai atnaujinta!")
+                report = store.prefill(url_list)
+                st.success(
+                    "Žinių bazė sėkmingai atnaujinta! "
+                    f"Nauji: {report['added']}, pakeisti: {report['updated']}, "
+                    f"nepakitę: {report['unchanged']}, pašalinti: {report['deleted']}."
+                )
             except Exception as e:
                 st.error(f"Klaida atnaujinant: {e}")
                 logging.error("Exception in data import: %s", traceback.format_exc())
@@ -0,0 +1,29 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from AnswerCache import AnswerCache
+
+EDITION_URL = "https://e-seimas.lrs.lt/portal/legalAct/lt/TAD/TAIS.150379/asr"
+
+
+def _cache(tmp_path) -> AnswerCache:
+    return AnswerCache(str(tmp_path), DeterministicFakeEmbedding(size=16))
+
+
+def test_lookup_requires_same_numbers(tmp_path):
+    cache = _cache(tmp_path)
+    question = "Koks straipsnio tekstas?"
+    cache.put(question, EDITION_URL, "5|", {"answer": "5"}, cache.generation(EDITION_URL))
+
+    assert cache.lookup(question, EDITION_URL, "5|")["response"] == {"answer": "5"}
+    assert cache.lookup(question, EDITION_URL, "6|") is None
+
+
+def test_put_after_invalidation_is_dropped(tmp_path):
+    cache = _cache(tmp_path)
+    question = "Koks pelno mokesčio tarifas?"
+    generation = cache.generation(EDITION_URL)
+
+    cache.invalidate_editions([EDITION_URL])
+    cache.put(question, EDITION_URL, "|", {"answer": "stale"}, generation)
+
+    assert cache.lookup(question, EDITION_URL, "|") is None
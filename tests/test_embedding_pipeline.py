@@ -0,0 +1,137 @@
+import base64
+import json
+import threading
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+import tiktoken
+from langchain_openai import OpenAIEmbeddings
+
+import EmbeddingPipeline as pipeline_module
+from CachedEmbeddings import CachedEmbeddings
+from EmbeddingPipeline import EmbeddingPipeline
+
+
+class _WordEncoding:
+    """Vienas žodis – vienas tokenas; testams nereikia tiktoken žodyno."""
+
+    def encode(self, text: str, disallowed_special=()) -> List[int]:
+        return list(range(len(text.split())))
+
+
+class _FakeEmbeddingsServer(ThreadingHTTPServer):
+    """Vietinis /v1/embeddings: pirmosios rate_limited užklausos gauna 429 su nurodytomis antraštėmis."""
+
+    def __init__(self, rate_limited: int, retry_headers: dict):
+        super().__init__(("127.0.0.1", 0), _FakeEmbeddingsHandler)
+        self.rate_limited = rate_limited
+        self.retry_headers = retry_headers
+        self.requests: List[List[str]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append(list(body["input"]))
+            limited = len(server.requests) <= server.rate_limited
+        if limited:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, server.retry_headers)
+            return
+        data = []
+        for i, text in enumerate(body["input"]):
+            vector = [float(len(text)), 1.0]
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        self._send(200, {"object": "list", "data": data, "model": body["model"], "usage": {"prompt_tokens": 1, "total_tokens": 1}})
+
+    def _send(self, status: int, payload: dict, headers: dict = None):
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(rate_limited: int, retry_headers: dict) -> _FakeEmbeddingsServer:
+        server = _FakeEmbeddingsServer(rate_limited, retry_headers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    recorded: List[float] = []
+    monkeypatch.setattr(pipeline_module, "time", SimpleNamespace(sleep=recorded.append))
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: _WordEncoding())
+    return recorded
+
+
+def _pipeline(tmp_path, server: _FakeEmbeddingsServer, max_retries: int):
+    client = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        base_url=server.base_url,
+        api_key="test",
+        max_retries=max_retries,
+        check_embedding_ctx_length=False,
+    )
+    embeddings = CachedEmbeddings(client, model="fake", path=str(tmp_path / "embedding_cache.sqlite3"))
+    return embeddings, EmbeddingPipeline(embeddings, max_batch_tokens=6, max_batch_size=2, max_workers=1)
+
+
+TEXTS = ["a b c", "d e f", "g h i", "j", "k", "l"]
+# 6 tokenų riba užbaigia pirmą paketą, 2 tekstų riba – kitus
+BATCHES = [["a b c", "d e f"], ["g h i", "j"], ["k", "l"]]
+
+
+def test_pipeline_retries_after_429_with_retry_after(tmp_path, start_server, sleeps):
+    server = start_server(rate_limited=1, retry_headers={"retry-after": "2"})
+    embeddings, pipeline = _pipeline(tmp_path, server, max_retries=0)
+
+    assert pipeline.run(TEXTS) == len(TEXTS)
+
+    assert server.requests == [BATCHES[0]] + BATCHES
+    assert sleeps == [2.0]
+    assert embeddings.missing(TEXTS) == []
+    assert embeddings.embed_documents(["k"]) == [[1.0, 1.0]]
+
+    assert pipeline.run(TEXTS) == 0
+    assert len(server.requests) == 4
+
+
+def test_client_retries_429_before_the_pipeline(tmp_path, start_server, sleeps):
+    server = start_server(rate_limited=1, retry_headers={"retry-after-ms": "10"})
+    embeddings, pipeline = _pipeline(tmp_path, server, max_retries=2)
+
+    assert pipeline.run(TEXTS) == len(TEXTS)
+
+    # OpenAI klientas pats pakartoja 429 užklausą, pipeline apie ją nesužino
+    assert server.requests == [BATCHES[0]] + BATCHES
+    assert sleeps == []
+    assert embeddings.missing(TEXTS) == []
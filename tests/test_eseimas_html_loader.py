@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from ESeimasHtmlLoader import ESeimasHtmlLoader
+from HttpFetcher import HttpFetcher
+from conftest import FIXTURES_DIR
+
+PORTAL_URL = "https://e-seimas.lrs.lt/portal/legalAct/lt/TAD/TAIS.150379/asr"
+
+
+@pytest.fixture
+def edition_html() -> str:
+    with open(os.path.join(FIXTURES_DIR, "eseimas_edition.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def real_edition_html() -> str:
+    # Sutrumpinta 2025 m. Pelno mokesčio įstatymo redakcija (data/PM.odt tekstas e-seimas žymėjimu)
+    with open(os.path.join(FIXTURES_DIR, "eseimas_pelno_mokescio_2025.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def _parse(html: str, backend: str):
+    loader = ESeimasHtmlLoader(fetcher=HttpFetcher(), backend=backend)
+    return {doc.metadata["id"]: doc for doc in loader.parse(html, PORTAL_URL)}
+
+
+def test_linked_heading_title_uses_rewritten_links(edition_html):
+    docs = _parse(edition_html, "soup")
+
+    article = docs["part_5_c7"]
+    assert article.metadata["title"] == (
+        '5 straipsnis. Pelno mokesčio[href="https://www.e-tar.lt/portal/lt/legalAct/TAR.4"] tarifai'
+    )
+    assert article.metadata["article_no"] == "5"
+    assert article.metadata["heararchy"] == (
+        "LIETUVOS RESPUBLIKOS PELNO MOKESČIO ĮSTATYMAS > "
+        'II SKYRIUS MOKESČIO[href="https://www.e-tar.lt/portal/lt/legalAct/TAR.3"] TARIFAI'
+    )
+    assert docs["part_5_1_d8"].metadata["article_no"] == "5-1"
+
+
+def test_stream_backend_matches_soup(real_edition_html):
+    soup_docs = ESeimasHtmlLoader(fetcher=HttpFetcher(), backend="soup").parse(real_edition_html, PORTAL_URL)
+    stream_docs = ESeimasHtmlLoader(fetcher=HttpFetcher(), backend="stream").parse(real_edition_html, PORTAL_URL)
+
+    assert [doc.metadata["article_no"] for doc in soup_docs] == [
+        None, None, "1", "2", None, "38-1", None, "46", None, "46-1"
+    ]
+    assert [doc.page_content for doc in stream_docs] == [doc.page_content for doc in soup_docs]
+    assert [doc.metadata for doc in stream_docs] == [doc.metadata for doc in soup_docs]
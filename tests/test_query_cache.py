@@ -0,0 +1,31 @@
+import threading
+
+from QueryCache import QueryCache
+
+
+def test_get_or_compute_caches_value():
+    cache = QueryCache(maxsize=10, ttl=60)
+
+    assert cache.get_or_compute("q", lambda: "value") == ("value", False)
+    assert cache.get_or_compute("q", lambda: "other") == ("value", True)
+    assert cache.stats()["hits"] == 1
+
+
+def test_compute_started_before_clear_is_not_stored():
+    cache = QueryCache(maxsize=10, ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_compute():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    worker = threading.Thread(target=cache.get_or_compute, args=("q", slow_compute))
+    worker.start()
+    assert started.wait(5)
+    cache.clear()
+    release.set()
+    worker.join(5)
+
+    assert cache.get_or_compute("q", lambda: "fresh") == ("fresh", False)